@@ -0,0 +1,244 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from BibleOsisExport import (Coverage, book_names, cache_dir, clear_cache, coverage_file, escape_attribute,
+                             escape_text, load_verse_stores, log_file, merge_verse_stores, output_file, translations,
+                             versification_dir, write_outputs)
+from Versification import chapter_verses
+
+# --- Synthetic text ---
+latin_letters = "abcdefghijklmnopqrstuvwxyz"
+# Telugu consonants and vowel signs, so the non-English files exercise multi-byte text
+indic_letters = "కగచజటడతదనపబమయరలవసహ" + "ాిీుూెేొో"
+
+# --- Benchmark phases, in the order they run ---
+# "parse" includes building the verse index: load_verse_stores streams each file's
+# records straight into its VerseStore (in a worker when jobs > 1), so the two never
+# run apart in the export.
+phases = ("parse", "cached_load", "merge", "serialize", "warnings")
+
+def synthetic_text(rng, letters, words):
+    return " ".join("".join(rng.choice(letters) for _ in range(rng.randint(2, 8))) for _ in range(words))
+
+def synthetic_verses(rng, books, missing_rate, words, letters):
+    """Yield (book number, chapter, verse, text) for the first `books` books, dropping missing_rate of verses."""
+    for bnum in list(chapter_verses)[:books]:
+        for cnum, count in enumerate(chapter_verses[bnum], 1):
+            for vnum in range(1, count + 1):
+                if rng.random() >= missing_rate:
+                    yield bnum, cnum, vnum, synthetic_text(rng, letters, rng.randint(words // 2, words * 3 // 2))
+
+def write_zefania(path, verses):
+    """Write records in the English Zefania BIBLEBOOK/CHAPTER/VERS layout."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<?xml version='1.0' encoding='utf-8'?>\n<XMLBIBLE>")
+        book = chapter = None
+        for bnum, cnum, vnum, text in verses:
+            if bnum != book:
+                if chapter is not None:
+                    f.write("</CHAPTER></BIBLEBOOK>")
+                f.write(f'<BIBLEBOOK bnumber="{bnum}" bname="{escape_attribute(book_names[bnum])}">')
+                book, chapter = bnum, None
+            if cnum != chapter:
+                if chapter is not None:
+                    f.write("</CHAPTER>")
+                f.write(f'<CHAPTER cnumber="{cnum}">')
+                chapter = cnum
+            f.write(f'<VERS vnumber="{vnum}">{escape_text(text)}</VERS>')
+        if chapter is not None:
+            f.write("</CHAPTER></BIBLEBOOK>")
+        f.write("</XMLBIBLE>\n")
+
+def write_testament(path, verses):
+    """Write records in the testament/book/chapter/verse layout of the Telugu, Tamil, Hindi and Nepali files."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<bible translation="Synthetic">\n')
+        testament = book = chapter = None
+        for bnum, cnum, vnum, text in verses:
+            name = "Old" if bnum <= 39 else "New"
+            if bnum != book:
+                if chapter is not None:
+                    f.write("\t\t\t</chapter>\n\t\t</book>\n")
+                if name != testament:
+                    if testament is not None:
+                        f.write("\t</testament>\n")
+                    f.write(f'\t<testament name="{name}">\n')
+                    testament = name
+                f.write(f'\t\t<book number="{bnum}">\n')
+                book, chapter = bnum, None
+            if cnum != chapter:
+                if chapter is not None:
+                    f.write("\t\t\t</chapter>\n")
+                f.write(f'\t\t\t<chapter number="{cnum}">\n')
+                chapter = cnum
+            f.write(f'\t\t\t\t<verse number="{vnum}">{escape_text(text)}</verse>\n')
+        if chapter is not None:
+            f.write("\t\t\t</chapter>\n\t\t</book>\n")
+        if testament is not None:
+            f.write("\t</testament>\n")
+        f.write("</bible>\n")
+
+def generate_inputs(directory, books=66, missing_rate=0.01, words=20, seed=1):
+    """Write each translation's input file into directory, under its usual name and in its layout.
+
+    The versification tables are copied alongside, so the run loads them just
+    as BibleOsisExport does. Returns the total size of the generated files.
+    """
+    rng = random.Random(seed)
+    size = 0
+    for _, _, file_name, version in translations:
+        path = os.path.join(directory, file_name)
+        letters = latin_letters if version == "Zefania" else indic_letters
+        verses = synthetic_verses(rng, books, missing_rate, words, letters)
+        (write_zefania if version == "Zefania" else write_testament)(path, verses)
+        size += os.path.getsize(path)
+    if os.path.isdir(versification_dir):
+        shutil.copytree(versification_dir, os.path.join(directory, versification_dir))
+    return size
+
+def run_phases(jobs):
+    """Run BibleOsisExport's default pipeline once in the current directory, yielding (phase, seconds).
+
+    Each phase calls the same functions as BibleOsisExport.main(): a cold
+    load_verse_stores that parses, indexes and fills the cache, a second one
+    served from the cache, merge_verse_stores drained on its own, then
+    write_outputs streaming it again, and the missing-verse report and
+    coverage matrix. serialize is the write_outputs time less the merge time,
+    so a slower merge does not show up in both.
+    """
+    clear_cache(cache_dir)
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with quiet:
+        load_verse_stores(jobs, cache_dir)
+    yield "parse", time.perf_counter() - start
+
+    start = time.perf_counter()
+    with quiet:
+        stores = load_verse_stores(jobs, cache_dir)
+    yield "cached_load", time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in merge_verse_stores(stores):
+        pass
+    merge_seconds = time.perf_counter() - start
+    yield "merge", merge_seconds
+
+    start = time.perf_counter()
+    write_outputs(merge_verse_stores(stores), [([t[0] for t in translations], output_file, "inline")])
+    yield "serialize", max(time.perf_counter() - start - merge_seconds, 0.0)
+
+    start = time.perf_counter()
+    coverage = Coverage.from_stores(stores)
+    with open(log_file, "w", encoding="utf-8") as f:
+        for line in coverage.report():
+            f.write(line + "\n")
+    coverage.save(coverage_file)
+    yield "warnings", time.perf_counter() - start
+
+def benchmark(jobs=1, repeat=3):
+    """Best time of `repeat` runs per phase, plus each phase's peak traced memory from one more run.
+
+    Only this process is traced, so with jobs > 1 the parse peak leaves out the
+    parsing done in the worker processes.
+    """
+    results = {phase: {"seconds": float("inf")} for phase in phases}
+    for _ in range(repeat):
+        gc.collect()
+        for phase, seconds in run_phases(jobs):
+            results[phase]["seconds"] = min(results[phase]["seconds"], seconds)
+
+    # Memory is traced in a separate run, since tracing slows everything down
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for phase, _ in run_phases(jobs):
+            results[phase]["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+    finally:
+        tracemalloc.stop()
+    return results
+
+def compare(results, baseline, threshold):
+    """Print each phase against the baseline; returns the phases that got slower by more than threshold."""
+    slower = []
+    for phase in phases:
+        now = results[phase]["seconds"]
+        before = baseline.get(phase, {}).get("seconds")
+        if not before:
+            print(f"{phase:11} {now:8.3f}s  (not in baseline)")
+            continue
+        change = (now - before) / before
+        flag = ""
+        if change > threshold:
+            flag = "  SLOWER"
+            slower.append(phase)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{phase:11} {now:8.3f}s  baseline {before:8.3f}s  {change:+7.1%}{flag}")
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory-profile each phase of BibleOsisExport "
+                                                 "on synthetic translation files.")
+    parser.add_argument("--books", type=int, default=66, help="number of books to generate, from Genesis (default: 66)")
+    parser.add_argument("--missing-rate", type=float, default=0.01,
+                        help="fraction of verses left out of each file (default: 0.01)")
+    parser.add_argument("--words", type=int, default=20, help="average words per verse (default: 20)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the generated text (default: 1)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per phase; the best is kept (default: 3)")
+    parser.add_argument("--jobs", type=int, default=min(len(translations), os.cpu_count() or 1),
+                        help="processes used to parse the translations, as in BibleOsisExport --jobs")
+    parser.add_argument("--output", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown beyond which a phase counts as a regression (default: 0.10)")
+    args = parser.parse_args()
+    if not 1 <= args.books <= 66:
+        parser.error("--books must be between 1 and 66")
+
+    config = {"books": args.books, "missing_rate": args.missing_rate, "words": args.words, "seed": args.seed,
+              "repeat": args.repeat, "jobs": args.jobs}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        size = generate_inputs(directory, args.books, args.missing_rate, args.words, args.seed)
+        print(f"Generated {len(translations)} files, {size / 1e6:.1f} MB, in {time.perf_counter() - start:.2f}s")
+        # BibleOsisExport reads and writes relative to the working directory
+        os.chdir(directory)
+        try:
+            results = benchmark(args.jobs, args.repeat)
+        finally:
+            os.chdir(cwd)
+
+    report = {"config": config, "python": platform.python_version(), "input_bytes": size, "phases": results}
+    slower = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print(f"[Warning] Baseline was run with {baseline.get('config')}")
+        slower = compare(results, baseline["phases"], args.threshold)
+    else:
+        for phase in phases:
+            print(f"{phase:11} {results[phase]['seconds']:8.3f}s  peak {results[phase]['peak_bytes'] / 1e6:7.1f} MB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        print(f"Results saved to {args.output}")
+    if slower:
+        sys.exit(f"Slower than baseline: {', '.join(slower)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import hashlib
+import json
+import time
+from array import array
+
+from BibleOsisExport import book_names, book_number, iter_verses
+from Versification import verse_count, verse_index, verse_ref
+
+# --- Report settings ---
+snippet_length = 60
+
+def detect_format(path):
+    """'Zefania' for an XMLBIBLE file, otherwise the testament/book/chapter/verse layout."""
+    with open(path, "rb") as f:
+        head = f.read(4096)
+    return "Zefania" if b"<XMLBIBLE" in head or b"<BIBLEBOOK" in head else "testament"
+
+def verse_hash(text):
+    # 0 is reserved for "no verse"
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little") | 1
+
+def snippet(text):
+    return text if len(text) <= snippet_length else text[:snippet_length - 1] + "…"
+
+class VerseHashes:
+    """One translation file reduced to a 64-bit hash per canonical verse.
+
+    hashes[i] is 0 where the file has no verse i; snippets[i] keeps the start
+    of its text for the report. References outside the canonical
+    versification go in `extra` as (hash, snippet).
+    """
+
+    def __init__(self, path, version=None):
+        self.hashes = array("Q", bytes(8 * verse_count))
+        self.snippets = [None] * verse_count
+        self.extra = {}
+        for bname, cnum, vnum, text in iter_verses(path, version or detect_format(path)):
+            i = verse_index(book_number(bname), int(cnum), int(vnum))
+            if i is None:
+                self.extra[(bname, cnum, vnum)] = verse_hash(text), snippet(text)
+            else:
+                self.hashes[i] = verse_hash(text)
+                self.snippets[i] = snippet(text)
+
+def diff_hashes(old, new):
+    """Compare two VerseHashes; returns {"added": [...], "removed": [...], "changed": [...]}.
+
+    Each entry is (book, chapter, verse, old snippet, new snippet). One pass
+    over the hash arrays plus the extras, so the cost is linear in the Bible.
+    """
+    result = {"added": [], "removed": [], "changed": []}
+    for i, (a, b) in enumerate(zip(old.hashes, new.hashes)):
+        if a == b:
+            continue
+        bnum, c, v = verse_ref(i)
+        kind = "added" if not a else "removed" if not b else "changed"
+        result[kind].append((book_names[bnum], str(c), str(v), old.snippets[i], new.snippets[i]))
+    for key in sorted(old.extra.keys() | new.extra.keys(), key=lambda k: (book_number(k[0]), int(k[1]), int(k[2]))):
+        a, old_text = old.extra.get(key, (0, None))
+        b, new_text = new.extra.get(key, (0, None))
+        if a != b:
+            kind = "added" if not a else "removed" if not b else "changed"
+            result[kind].append((*key, old_text, new_text))
+    return result
+
+def changed_books(result):
+    names = {entry[0] for entries in result.values() for entry in entries}
+    return sorted(names, key=book_number)
+
+def print_report(result):
+    for bname, cnum, vnum, _, text in result["added"]:
+        print(f"Added   {bname} {cnum}:{vnum}: {text}")
+    for bname, cnum, vnum, text, _ in result["removed"]:
+        print(f"Removed {bname} {cnum}:{vnum}: {text}")
+    for bname, cnum, vnum, old_text, new_text in result["changed"]:
+        print(f"Changed {bname} {cnum}:{vnum}: {old_text}")
+        print(f"{'':>{len(f'Changed {bname} {cnum}:{vnum}')}}  -> {new_text}")
+
+def main():
+    parser = argparse.ArgumentParser(description="List the verses that differ between two editions of a translation.")
+    parser.add_argument("old", help="previous translation file")
+    parser.add_argument("new", help="new translation file")
+    parser.add_argument("--format", choices=("Zefania", "testament"),
+                        help="input layout of both files (default: detected from each file)")
+    parser.add_argument("--json", metavar="FILE",
+                        help="also write the differences as JSON; pass it to BibleOsisExport --incremental --diff "
+                             "to re-merge only the changed books")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    old = VerseHashes(args.old, args.format)
+    new = VerseHashes(args.new, args.format)
+    result = diff_hashes(old, new)
+    elapsed = time.perf_counter() - start
+
+    print_report(result)
+    books = changed_books(result)
+    print(f"{len(result['added'])} added, {len(result['removed'])} removed, {len(result['changed'])} changed "
+          f"in {len(books)} books ({elapsed:.2f}s)")
+    if args.json:
+        report = {"old": args.old, "new": args.new, "books": books}
+        for kind, entries in result.items():
+            report[kind] = [{"book": b, "chapter": c, "verse": v, "old": o, "new": n} for b, c, v, o, n in entries]
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f"Differences saved to {args.json}")
+
+if __name__ == "__main__":
+    main()
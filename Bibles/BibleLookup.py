@@ -0,0 +1,195 @@
+import argparse
+import os
+import re
+import time
+import unicodedata
+from functools import lru_cache
+
+from BibleOsisExport import VerseStore, book_names, store_dir, translations
+from Versification import chapter_start, chapter_verses, verse_ref
+
+# --- Localized book names, keyed by the numbers used in telugu_book_names ---
+telugu_names = {
+    1: "ఆదికాండము", 2: "నిర్గమకాండము", 3: "లేవీయకాండము", 4: "సంఖ్యాకాండము", 5: "ద్వితీయోపదేశకాండము",
+    6: "యెహోషువ", 7: "న్యాయాధిపతులు", 8: "రూతు", 9: "1 సమూయేలు", 10: "2 సమూయేలు",
+    11: "1 రాజులు", 12: "2 రాజులు", 13: "1 దినవృత్తాంతములు", 14: "2 దినవృత్తాంతములు", 15: "ఎజ్రా",
+    16: "నెహెమ్యా", 17: "ఎస్తేరు", 18: "యోబు", 19: "కీర్తనలు", 20: "సామెతలు",
+    21: "ప్రసంగి", 22: "పరమగీతము", 23: "యెషయా", 24: "యిర్మీయా", 25: "విలాపవాక్యములు",
+    26: "యెహెజ్కేలు", 27: "దానియేలు", 28: "హోషేయ", 29: "యోవేలు", 30: "ఆమోసు",
+    31: "ఓబద్యా", 32: "యోనా", 33: "మీకా", 34: "నహూము", 35: "హబక్కూకు",
+    36: "జెఫన్యా", 37: "హగ్గయి", 38: "జెకర్యా", 39: "మలాకీ",
+    40: "మత్తయి", 41: "మార్కు", 42: "లూకా", 43: "యోహాను", 44: "అపొస్తలుల కార్యములు",
+    45: "రోమీయులకు", 46: "1 కొరింథీయులకు", 47: "2 కొరింథీయులకు", 48: "గలతీయులకు", 49: "ఎఫెసీయులకు",
+    50: "ఫిలిప్పీయులకు", 51: "కొలొస్సయులకు", 52: "1 థెస్సలొనీకయులకు", 53: "2 థెస్సలొనీకయులకు", 54: "1 తిమోతికి",
+    55: "2 తిమోతికి", 56: "తీతుకు", 57: "ఫిలేమోనుకు", 58: "హెబ్రీయులకు", 59: "యాకోబు",
+    60: "1 పేతురు", 61: "2 పేతురు", 62: "1 యోహాను", 63: "2 యోహాను", 64: "3 యోహాను",
+    65: "యూదా", 66: "ప్రకటన"
+}
+
+hindi_names = {
+    1: "उत्पत्ति", 2: "निर्गमन", 3: "लैव्यव्यवस्था", 4: "गिनती", 5: "व्यवस्थाविवरण",
+    6: "यहोशू", 7: "न्यायियों", 8: "रूत", 9: "1 शमूएल", 10: "2 शमूएल",
+    11: "1 राजाओं", 12: "2 राजाओं", 13: "1 इतिहास", 14: "2 इतिहास", 15: "एज्रा",
+    16: "नहेमायाह", 17: "एस्तेर", 18: "अय्यूब", 19: "भजन संहिता", 20: "नीतिवचन",
+    21: "सभोपदेशक", 22: "श्रेष्ठगीत", 23: "यशायाह", 24: "यिर्मयाह", 25: "विलापगीत",
+    26: "यहेजकेल", 27: "दानिय्येल", 28: "होशे", 29: "योएल", 30: "आमोस",
+    31: "ओबद्याह", 32: "योना", 33: "मीका", 34: "नहूम", 35: "हबक्कूक",
+    36: "सपन्याह", 37: "हाग्गै", 38: "जकर्याह", 39: "मलाकी",
+    40: "मत्ती", 41: "मरकुस", 42: "लूका", 43: "यूहन्ना", 44: "प्रेरितों के काम",
+    45: "रोमियों", 46: "1 कुरिन्थियों", 47: "2 कुरिन्थियों", 48: "गलातियों", 49: "इफिसियों",
+    50: "फिलिप्पियों", 51: "कुलुस्सियों", 52: "1 थिस्सलुनीकियों", 53: "2 थिस्सलुनीकियों", 54: "1 तीमुथियुस",
+    55: "2 तीमुथियुस", 56: "तीतुस", 57: "फिलेमोन", 58: "इब्रानियों", 59: "याकूब",
+    60: "1 पतरस", 61: "2 पतरस", 62: "1 यूहन्ना", 63: "2 यूहन्ना", 64: "3 यूहन्ना",
+    65: "यहूदा", 66: "प्रकाशितवाक्य"
+}
+
+# --- Abbreviations that a plain prefix match would find ambiguous ---
+book_aliases = {
+    "jn": 43, "jhn": 43, "mt": 40, "mk": 41, "lk": 42, "ps": 19, "psa": 19, "psalm": 19,
+    "phil": 50, "php": 50, "phlm": 57, "jud": 7, "jdg": 7, "jas": 59, "song": 22, "sos": 22,
+    "rev": 66, "ezr": 15, "eze": 26, "ezek": 26,
+}
+
+reference_re = re.compile(
+    r"^\s*(?P<book>(?:[1-3]\s*)?[^\d\s:][^\d:]*?|\d+)\s*"
+    r"(?:(?P<c1>\d+)(?::(?P<v1>\d+))?(?:\s*[-–]\s*(?P<x>\d+)(?::(?P<y>\d+))?)?)?\s*$"
+)
+
+def normalize_name(name):
+    return re.sub(r"[\s.]+", "", unicodedata.normalize("NFC", name)).casefold()
+
+book_lookup = {}
+for _num, _name in book_names.items():
+    book_lookup[normalize_name(_name)] = _num
+    book_lookup[normalize_name(telugu_names[_num])] = _num
+    book_lookup[normalize_name(hindi_names[_num])] = _num
+book_lookup.update(book_aliases)
+
+def parse_book(text):
+    """Book number for an English, Telugu or Hindi name, a unique prefix of one, or a book number."""
+    if text.strip().isdigit():
+        num = int(text)
+        if num not in book_names:
+            raise ValueError(f"No book number {num}")
+        return num
+    key = normalize_name(text)
+    if key in book_lookup:
+        return book_lookup[key]
+    matches = {num for name, num in book_lookup.items() if name.startswith(key)}
+    if len(matches) != 1:
+        raise ValueError(f"{'Ambiguous' if matches else 'Unknown'} book name: {text.strip()}")
+    return matches.pop()
+
+def parse_reference(reference, extra=frozenset()):
+    """Turn 'John 3:16-18', '1 Cor 13', 'Ps 23-24' or '43 3:16' into (book, (c, v), (c, v)).
+
+    A missing verse means the whole chapter and a missing chapter the whole
+    book, except in one-chapter books, where 'Jude 3' or 'Obadiah 15-17' name
+    verses. Verses past the canonical end of a chapter are only accepted if
+    their (book, chapter, verse) key is in `extra`.
+    """
+    m = reference_re.match(reference)
+    if not m:
+        raise ValueError(f"Cannot parse reference: {reference}")
+    book = parse_book(m["book"])
+    counts = chapter_verses[book]
+    c1, v1, x, y = (int(g) if g else None for g in m.group("c1", "v1", "x", "y"))
+    if c1 is None:
+        return book, (1, 1), (len(counts), counts[-1])
+    if v1 is None and y is None and len(counts) == 1:
+        # Verse range of a one-chapter book: "Jude 3", "Obadiah 15-17"
+        start, end = (1, c1), (1, x or c1)
+    elif v1 is None:
+        # Chapter range: "13", "23-24" or "3-4:2"
+        last = x or c1
+        end = (last, y) if y else (last, counts[last - 1] if last <= len(counts) else 0)
+        start = (c1, 1)
+    else:
+        start = (c1, v1)
+        end = (x, y) if y else (c1, x or v1)
+    if not 1 <= start[0] <= len(counts) or not 1 <= end[0] <= len(counts) or start > end:
+        raise ValueError(f"Reference out of range: {reference}")
+    for c, v in (start, end):
+        if not 1 <= v <= counts[c - 1] and (book_names[book], str(c), str(v)) not in extra:
+            raise ValueError(f"Reference out of range: {reference}")
+    return book, start, end
+
+class BibleLookup:
+    """Aligned passage lookup over the .vstore files written by BibleOsisExport --export-binary.
+
+    Stores are memory-mapped on first use and hot passages are kept in an LRU
+    cache, so repeated lookups cost a dictionary hit.
+    """
+
+    def __init__(self, directory=store_dir, cache_size=1024):
+        self.directory = directory
+        self.stores = {}
+        self.passage = lru_cache(maxsize=cache_size)(self._passage)
+
+    def store(self, code):
+        if code not in self.stores:
+            self.stores[code] = VerseStore.open(os.path.join(self.directory, f"{code}.vstore"))
+        return self.stores[code]
+
+    def _passage(self, reference, languages=None):
+        """Tuple of (book, chapter, verse, {language: text}) for every verse in the reference."""
+        codes = languages or tuple(t[0] for t in translations)
+        stores = [(code, self.store(code)) for code in codes]
+        book, start, end = parse_reference(reference, {key for _, store in stores for key in store.extra})
+        bname = book_names[book]
+        # Clamp to the canonical chapters; numbers past their end are served from the extras
+        first = chapter_start[book][start[0] - 1] + min(start[1] - 1, chapter_verses[book][start[0] - 1])
+        last = chapter_start[book][end[0] - 1] + min(end[1], chapter_verses[book][end[0] - 1]) - 1
+
+        verses = []
+        for i in range(first, last + 1):
+            _, c, v = verse_ref(i)
+            verses.append((bname, str(c), str(v), {code: store.text(i) for code, store in stores}))
+        # Verses some translations number past the canonical end of a chapter
+        extras = sorted({key for _, store in stores for key in store.extra
+                         if key[0] == bname and start <= (int(key[1]), int(key[2])) <= end},
+                        key=lambda key: (int(key[1]), int(key[2])))
+        for key in extras:
+            texts = {code: store.extra.get(key, "") for code, store in stores}
+            verses.append((*key, texts))
+        verses.sort(key=lambda verse: (int(verse[1]), int(verse[2])))
+        return tuple(verses)
+
+def parse_languages(text):
+    """'eng,tel' -> ('eng', 'tel'), checked against the exported translations."""
+    codes = tuple(c.strip() for c in text.split(",") if c.strip())
+    known = [t[0] for t in translations]
+    for code in codes:
+        if code not in known:
+            raise argparse.ArgumentTypeError(f"unknown language {code!r} (choose from {', '.join(known)})")
+    return codes
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up a Bible passage in the exported verse stores.")
+    parser.add_argument("reference", nargs="+", help="e.g. 'John 3:16-18', '1 Cor 13', 'యోహాను 3:16', '43 3:16'")
+    parser.add_argument("--lang", type=parse_languages,
+                        help="comma-separated language codes (default: all), e.g. eng,tel")
+    parser.add_argument("--stores", default=store_dir, help=f"directory of .vstore files (default: {store_dir})")
+    args = parser.parse_args()
+
+    lookup = BibleLookup(args.stores)
+    languages = args.lang or None
+    for reference in args.reference:
+        start = time.perf_counter()
+        try:
+            verses = lookup.passage(reference, languages)
+        except ValueError as e:
+            print(f"[Warning] {e}")
+            continue
+        except FileNotFoundError as e:
+            print(f"[Warning] No verse store {e.filename}; "
+                  f"run BibleOsisExport.py --export-binary {args.stores} to write them")
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        for bname, cnum, vnum, texts in verses:
+            for code, text in texts.items():
+                print(f"{bname} {cnum}:{vnum} [{code}] {text}")
+        print(f"({len(verses)} verses in {elapsed:.2f} ms)")
+
+if __name__ == "__main__":
+    main()
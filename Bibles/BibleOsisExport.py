@@ -1,5 +1,24 @@
+import argparse
+import glob
+import hashlib
+import heapq
+import io
+import json
+import mmap
+import os
+import queue
+import re
+import shutil
+import sqlite3
+import struct
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import xml.etree.ElementTree as ET
 
+from Versification import VerseMap, book_bounds, chapter_start, chapter_verses, verse_count, verse_index, verse_ref
+
 # --- Input files ---
 english_file = "EnglishBible.xml"
 telugu_file = "TeluguBible.xml"
@@ -8,6 +27,64 @@ hindi_file = "HindiOVBSIBible.xml"
 nepali_file = "Nepali2021Bible.xml"
 output_file = "MergedBible.osis.xml"
 log_file = "merge_warnings.log"
+coverage_file = "MergedBible.coverage"
+cache_dir = ".verse_cache"
+store_dir = "VerseStores"
+openlp_dir = "OpenLP"
+# Per-translation versification tables, <code>.txt
+versification_dir = "VersificationMaps"
+# Sidecar next to each input file recording the byte range of every book
+book_index_suffix = ".books.json"
+
+# --- Translations, in the order they appear inside each merged verse ---
+# (language code, label, input file, source format)
+translations = [
+    ("eng", "English", english_file, "Zefania"),
+    ("tel", "Telugu", telugu_file, "Telugu"),
+    ("tam", "Tamil", tamil_file, "Tamil"),
+    ("hin", "Hindi", hindi_file, "Hindi"),
+    ("nep", "Nepali", nepali_file, "Nepali"),
+]
+# xml:lang value for each translation in the lean markup style
+xml_languages = {"eng": "en", "tel": "te", "tam": "ta", "hin": "hi", "nep": "ne"}
+# The default merge walks this translation's verses and probes the others
+primary_language = "tel"
+
+# --- OSIS output ---
+osis_attributes = {
+    "xmlns": "http://www.bibletechnologies.net/2003/OSIS/namespace",
+    "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
+    "xsi:schemaLocation": "http://www.bibletechnologies.net/2003/OSIS/namespace http://www.bibletechnologies.net/osisCore.2.1.1.xsd"
+}
+osis_title = "Merged English-Telugu-Tamil-Hindi-Nepali Bible"
+osis_language = "ENG-TEL-TAM-HIN-NEP"
+# Verses are handed to the output writers in batches of this many
+output_batch_size = 2000
+# Sent to the writer threads in place of the end marker when the merged records fail part-way
+output_aborted = object()
+
+# --- Parse cache ---
+# Bump whenever parsing changes what ends up in a VerseStore, so old cache entries are ignored
+parser_version = 2
+
+# --- Incremental shards ---
+# Bump whenever OsisWriter or the verse markup changes the bytes written for a book,
+# so shards from an older format are rebuilt instead of stitched in
+osis_format_version = 1
+
+# --- Binary verse store layout ---
+# header | offsets (uint32 x verse_count + 1) | present (uint8 x verse_count) | UTF-8 text | extras (JSON)
+store_magic = b"VSTR"
+store_format_version = 1
+store_header = struct.Struct("<4sHHIII")  # magic, version, reserved, verse_count, text size, extras size
+
+# --- Coverage matrix layout ---
+# header | language codes (ASCII, comma separated) | scope row | one row per language | extras (JSON)
+# Every row has one byte per canonical verse: 1 = in the merged output / has text.
+# The extras trailer lists the non-canonical verses as [book, chapter, verse, flags per language].
+coverage_magic = b"VCOV"
+coverage_format_version = 2
+coverage_header = struct.Struct("<4sHHI")  # magic, version, codes length, verse_count
 
 # --- Telugu book number mapping (Old + New Testament) ---
 telugu_book_names = {
@@ -33,110 +110,1047 @@ book_name_corrections = {
     "Song Of Solomon": "Song of Solomon"
 }
 
-# --- Parse XML roots ---
-eng_root = ET.parse(english_file).getroot()
-tel_root = ET.parse(telugu_file).getroot()
-tam_root = ET.parse(tamil_file).getroot()
-hin_root = ET.parse(hindi_file).getroot()
-nep_root = ET.parse(nepali_file).getroot()
-
-# --- Create OSIS root ---
-osis = ET.Element("osis", {
-    "xmlns": "http://www.bibletechnologies.net/2003/OSIS/namespace",
-    "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
-    "xsi:schemaLocation": "http://www.bibletechnologies.net/2003/OSIS/namespace http://www.bibletechnologies.net/osisCore.2.1.1.xsd"
-})
-
-# --- Header ---
-header = ET.SubElement(osis, "header")
-ET.SubElement(header, "work").text = "Merged English-Telugu-Tamil-Hindi-Nepali Bible"
-ET.SubElement(header, "title").text = "Merged English-Telugu-Tamil-Hindi-Nepali Bible"
-ET.SubElement(header, "language").text = "ENG-TEL-TAM-HIN-NEP"
-
-# --- osisText ---
-osis_text = ET.SubElement(osis, "osisText", {"osisIDWork": "MergedBible", "language": "ENG-TEL-TAM-HIN-NEP"})
+# --- Canonical book order (name -> number), used to align streams ---
+book_numbers = {name: int(num) for num, name in telugu_book_names.items()}
+book_names = {num: name for name, num in book_numbers.items()}
 
 # --- Helper functions ---
 def normalize_book_name(name):
     n = name.title()
     return book_name_corrections.get(n, n)
 
-def build_verse_dict(root, version):
-    verses = {}
-    for testament in root.findall("testament"):
-        for book in testament.findall("book"):
-            bnum = book.attrib["number"]
-            bname = normalize_book_name(telugu_book_names.get(bnum, f"Book{bnum}"))
-            verses[bname] = {}
-            for chapter in book.findall("chapter"):
-                cnum = chapter.attrib["number"]
-                verses[bname][cnum] = {}
-                for verse in chapter.findall("verse"):
-                    vnum = verse.attrib["number"]
-                    verses[bname][cnum][vnum] = verse.text or ""
+def book_element_name(tag, attrib):
+    """Canonical book name for a <book number=...> or <BIBLEBOOK bname=...> element."""
+    if tag == "BIBLEBOOK":
+        return normalize_book_name(attrib["bname"])
+    bnum = attrib["number"]
+    return normalize_book_name(telugu_book_names.get(bnum, f"Book{bnum}"))
+
+def iter_testament_verses(path):
+    """Stream (book, chapter, verse, text) records from a testament/book/chapter/verse file.
+
+    Uses iterparse and clears each element once it is consumed, so only the
+    current chapter is ever held in memory instead of the whole tree.
+    """
+    bname = cnum = None
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == "book":
+                bname = book_element_name(tag, elem.attrib)
+            elif tag == "chapter":
+                cnum = elem.attrib["number"]
+        elif tag == "verse":
+            yield bname, cnum, elem.attrib["number"], elem.text or ""
+            elem.clear()
+        elif tag in ("chapter", "book"):
+            elem.clear()
+
+def iter_zefania_verses(path):
+    """Stream (book, chapter, verse, text) records from a Zefania BIBLEBOOK/CHAPTER/VERS file."""
+    bname = cnum = None
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == "BIBLEBOOK":
+                bname = book_element_name(tag, elem.attrib)
+            elif tag == "CHAPTER":
+                cnum = elem.attrib["cnumber"]
+        elif tag == "VERS":
+            yield bname, cnum, elem.attrib["vnumber"], elem.text or ""
+            elem.clear()
+        elif tag in ("CHAPTER", "BIBLEBOOK"):
+            elem.clear()
+
+def iter_verses(path, version):
     # English Zefania special format
     if version == "Zefania":
-        verses_eng = {}
-        for book in root.findall("BIBLEBOOK"):
-            bname = normalize_book_name(book.attrib["bname"])
-            verses_eng[bname] = {}
-            for chapter in book.findall("CHAPTER"):
-                cnum = chapter.attrib["cnumber"]
-                verses_eng[bname][cnum] = {}
-                for verse in chapter.findall("VERS"):
-                    vnum = verse.attrib["vnumber"]
-                    verses_eng[bname][cnum][vnum] = verse.text or ""
-        return verses_eng
-    return verses
-
-# --- Build verse dictionaries ---
-eng_verses = build_verse_dict(eng_root, "Zefania")
-tel_verses = build_verse_dict(tel_root, "Telugu")
-tam_verses = build_verse_dict(tam_root, "Tamil")
-hin_verses = build_verse_dict(hin_root, "Hindi")
-nep_verses = build_verse_dict(nep_root, "Nepali")
-
-warnings = []
-
-# --- Merge all verses ---
-for bname, chapters in tel_verses.items():
-    book_div = ET.SubElement(osis_text, "div", {"type": "book", "osisID": bname})
-    for cnum, verses in chapters.items():
-        chapter_elem = ET.SubElement(book_div, "chapter", {"osisID": f"{bname}.{cnum}"})
-        for vnum, tel_text in verses.items():
-            eng_text = eng_verses.get(bname, {}).get(cnum, {}).get(vnum, "")
-            tam_text = tam_verses.get(bname, {}).get(cnum, {}).get(vnum, "")
-            hin_text = hin_verses.get(bname, {}).get(cnum, {}).get(vnum, "")
-            nep_text = nep_verses.get(bname, {}).get(cnum, {}).get(vnum, "")
-
-            # Record missing verses
-            if not eng_text:
-                warnings.append(f"WARNING: Missing English verse for {bname} {cnum}:{vnum}")
-            if not tel_text:
-                warnings.append(f"WARNING: Missing Telugu verse for {bname} {cnum}:{vnum}")
-            if not tam_text:
-                warnings.append(f"WARNING: Missing Tamil verse for {bname} {cnum}:{vnum}")
-            if not hin_text:
-                warnings.append(f"WARNING: Missing Hindi verse for {bname} {cnum}:{vnum}")
-            if not nep_text:
-                warnings.append(f"WARNING: Missing Nepali verse for {bname} {cnum}:{vnum}")
-
-            verse_elem = ET.SubElement(chapter_elem, "verse", {"osisID": f"{bname}.{cnum}.{vnum}"})
-            verse_elem.text = (
-                f"{{lang-eng}}<sup>{cnum}:{vnum}</sup>{eng_text}{{/lang-eng}} "
-                f"{{lang-tel}}<sup>{cnum}:{vnum}</sup>{tel_text}{{/lang-tel}} "
-                f"{{lang-tam}}<sup>{cnum}:{vnum}</sup>{tam_text}{{/lang-tam}} "
-                f"{{lang-hin}}<sup>{cnum}:{vnum}</sup>{hin_text}{{/lang-hin}} "
-                f"{{lang-nep}}<sup>{cnum}:{vnum}</sup>{nep_text}{{/lang-nep}}"
-            )
-
-# --- Write output ---
-ET.ElementTree(osis).write(output_file, encoding="utf-8", xml_declaration=True)
-
-# --- Write warnings ---
-with open(log_file, "w", encoding="utf-8") as f:
-    for w in warnings:
-        f.write(w + "\n")
-
-print(f"Merged OSIS Bible saved to {output_file}")
-print(f"Warnings saved to {log_file}")
+        return iter_zefania_verses(path)
+    return iter_testament_verses(path)
+
+# --- Book byte-offset index ---
+book_tag_re = re.compile(rb"<(/?)(book|BIBLEBOOK)\b([^>]*)>")
+attribute_re = re.compile(rb"""([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+
+def scan_book_offsets(path):
+    """Map each book name to the [start, end) byte range of its element, in one pass over the raw file."""
+    books = {}
+    if os.path.getsize(path) == 0:
+        return books
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        bname = start = None
+        for m in book_tag_re.finditer(data):
+            if not m[1]:
+                attrib = {k.decode(): (v1 or v2).decode("utf-8") for k, v1, v2 in attribute_re.findall(m[3])}
+                bname, start = book_element_name(m[2].decode(), attrib), m.start()
+            elif start is not None:
+                books[bname] = [start, m.end()]
+                start = None
+    return books
+
+def load_book_index(path):
+    """Book byte ranges of an input file, rescanned whenever its size or mtime no longer match the sidecar."""
+    st = os.stat(path)
+    stamp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    index_path = path + book_index_suffix
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("source") == stamp:
+            return index["books"]
+    books = scan_book_offsets(path)
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"source": stamp, "books": books}, f, ensure_ascii=False, indent=1)
+    os.replace(index_path + ".tmp", index_path)
+    return books
+
+def iter_book_verses(path, version, bname):
+    """Stream one book's records, reading and parsing only that book's bytes."""
+    span = load_book_index(path).get(bname)
+    if span is None:
+        return
+    with open(path, "rb") as f:
+        f.seek(span[0])
+        fragment = f.read(span[1] - span[0])
+    yield from iter_verses(io.BytesIO(fragment), version)
+
+def iter_selected_verses(path, version, books=None):
+    """All of a file's records, or only those of the given books via the book index."""
+    if books is None:
+        return iter_verses(path, version)
+    return (record for bname in books for record in iter_book_verses(path, version, bname))
+
+class VerseStore:
+    """One translation's verses packed into a single UTF-8 buffer.
+
+    Every canonical verse (see Versification) has a dense index i; its text is
+    buffer[offsets[i]:offsets[i + 1]] and present[i] records whether the source
+    had the verse at all. References outside the canonical versification are
+    kept as-is in `extra`.
+    """
+
+    def __init__(self, buffer, offsets, present, extra):
+        self.buffer = buffer
+        self.offsets = offsets
+        self.present = present
+        self.extra = extra
+
+    @classmethod
+    def from_records(cls, records, verse_map=None):
+        """Pack records, placing each verse at its canonical index (via verse_map if given)."""
+        chunks = {}
+        extra = {}
+        for bname, cnum, vnum, text in records:
+            ref = book_number(bname), int(cnum), int(vnum)
+            i = verse_map.canonical_index(*ref) if verse_map else verse_index(*ref)
+            if i is None:
+                extra[(bname, cnum, vnum)] = text
+            elif chunks.get(i):
+                # Several of the translation's verses make up this canonical one
+                if text:
+                    chunks[i] += b" " + text.encode("utf-8")
+            else:
+                chunks[i] = text.encode("utf-8")
+        buffer = bytearray()
+        offsets = array("I", [0])
+        present = bytearray(verse_count)
+        for i in range(verse_count):
+            chunk = chunks.get(i)
+            if chunk is not None:
+                buffer += chunk
+                present[i] = 1
+            offsets.append(len(buffer))
+        return cls(bytes(buffer), offsets, present, extra)
+
+    @classmethod
+    def open(cls, path):
+        """Map a file written by save(); verse text is sliced straight out of the mapping."""
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapping)
+        magic, version, _, count, text_size, extra_size = store_header.unpack_from(view)
+        if magic != store_magic or version != store_format_version or count != verse_count:
+            raise ValueError(f"{path} is not a version {store_format_version} verse store")
+        pos = store_header.size
+        offsets = view[pos:pos + 4 * (count + 1)].cast("I")
+        if sys.byteorder != "little":
+            offsets = array("I", offsets)
+            offsets.byteswap()
+        pos += 4 * (count + 1)
+        present = view[pos:pos + count]
+        pos += count
+        buffer = view[pos:pos + text_size]
+        pos += text_size
+        extra = {(b, c, v): t for b, c, v, t in json.loads(str(view[pos:pos + extra_size], "utf-8"))}
+        store = cls(buffer, offsets, present, extra)
+        store.mapping = mapping
+        return store
+
+    def __getstate__(self):
+        # Mapped stores travel to worker processes as plain bytes
+        return bytes(self.buffer), array("I", self.offsets), bytes(self.present), self.extra
+
+    def __setstate__(self, state):
+        self.buffer, self.offsets, self.present, self.extra = state
+
+    def save(self, path):
+        """Write the store to path + ".tmp" and move it into place, so readers mapping path never see a partial file."""
+        offsets = array("I", self.offsets)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        extra = json.dumps([[*key, text] for key, text in self.extra.items()], ensure_ascii=False).encode("utf-8")
+        with open(path + ".tmp", "wb") as f:
+            f.write(store_header.pack(store_magic, store_format_version, 0, verse_count, len(self.buffer), len(extra)))
+            f.write(offsets.tobytes())
+            f.write(self.present)
+            f.write(self.buffer)
+            f.write(extra)
+        os.replace(path + ".tmp", path)
+
+    def __len__(self):
+        return sum(self.present) + len(self.extra)
+
+    def verse_bytes(self, index):
+        """UTF-8 text of a verse as a slice of the buffer (no copy for mapped stores)."""
+        return self.buffer[self.offsets[index]:self.offsets[index + 1]]
+
+    def text(self, index):
+        return str(self.verse_bytes(index), "utf-8")
+
+    def lookup(self, index, bname, cnum, vnum):
+        if index is None:
+            return self.extra.get((bname, cnum, vnum), "")
+        return self.text(index)
+
+    def references(self, bname=None):
+        """(index, book, chapter, verse) of every verse the source had, in canonical order.
+
+        index is None for references outside the canonical versification.
+        Pass bname to walk a single book.
+        """
+        if bname is None:
+            start, end = 0, verse_count
+        elif bname in book_numbers:
+            start, end = book_bounds(book_numbers[bname])
+        else:
+            start = end = 0
+        canonical = (
+            (i, book_names[b], str(c), str(v))
+            for i in range(start, end) if self.present[i]
+            for b, c, v in [verse_ref(i)]
+        )
+        extras = sorted(((None,) + key for key in self.extra if bname in (None, key[0])),
+                        key=lambda r: verse_key(r[1:]))
+        return heapq.merge(canonical, extras, key=lambda r: verse_key(r[1:]))
+
+    def books(self):
+        """Names of the books this translation has, in canonical order."""
+        names = [name for name, num in book_numbers.items()
+                 if any(self.present[slice(*book_bounds(num))])]
+        names.extend(name for name in {key[0] for key in self.extra} if name not in names)
+        return sorted(names, key=book_number)
+
+    def book_digest(self, bname):
+        """Hash of everything this translation holds for one book."""
+        h = hashlib.blake2b(digest_size=16)
+        if bname in book_numbers:
+            start, end = book_bounds(book_numbers[bname])
+            base = self.offsets[start]
+            h.update(bytes(self.present[start:end]))
+            h.update(array("I", (o - base for o in self.offsets[start:end + 1])).tobytes())
+            h.update(self.buffer[base:self.offsets[end]])
+        extras = sorted((key, text) for key, text in self.extra.items() if key[0] == bname)
+        h.update(json.dumps(extras, ensure_ascii=False).encode("utf-8"))
+        return h.hexdigest()
+
+ref_re = re.compile(r"^(.+?)\s+(\d+):(\d+)(?:-(\d+))?$")
+
+def parse_map_ref(text):
+    m = ref_re.match(text.strip())
+    if not m or normalize_book_name(m[1]) not in book_numbers:
+        raise ValueError(f"Bad reference in versification table: {text.strip()}")
+    return book_numbers[normalize_book_name(m[1])], int(m[2]), int(m[3]), int(m[4] or m[3])
+
+def versification_path(code):
+    return os.path.join(versification_dir, f"{code}.txt")
+
+def load_verse_map(code):
+    """Compile a translation's versification table into a VerseMap, or None if it has none."""
+    path = versification_path(code)
+    if not os.path.exists(path):
+        return None
+    pairs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            source, target = line.split("=", 1)
+            book, chapter, first, last = parse_map_ref(source)
+            target_book, target_chapter, target_verse, _ = parse_map_ref(target)
+            for offset, verse in enumerate(range(first, last + 1)):
+                pairs.append(((book, chapter, verse), (target_book, target_chapter, target_verse + offset)))
+    return VerseMap(pairs)
+
+def map_records(records, verse_map):
+    """Renumber a stream of records into the canonical versification."""
+    for bname, cnum, vnum, text in records:
+        i = verse_map.canonical_index(book_number(bname), int(cnum), int(vnum))
+        if i is None:
+            yield bname, cnum, vnum, text
+        else:
+            b, c, v = verse_ref(i)
+            yield book_names[b], str(c), str(v), text
+
+def build_verse_store(path, version, verse_map=None, books=None):
+    return VerseStore.from_records(iter_selected_verses(path, version, books), verse_map)
+
+def parse_translation(translation, books=None):
+    code, _, path, version = translation
+    return build_verse_store(path, version, load_verse_map(code), books)
+
+def source_digest(translation):
+    """Cache key for a translation: its file content, format, versification table and the parser version."""
+    code, _, path, version = translation
+    h = hashlib.sha256(f"{parser_version}:{store_format_version}:{version}\n".encode("utf-8"))
+    for source in (versification_path(code), path):
+        if os.path.exists(source):
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        h.update(b"\0")
+    return h.hexdigest()[:32]
+
+def cache_path(cache, translation, digest):
+    return os.path.join(cache, f"{translation[0]}-{digest}.vstore")
+
+def save_to_cache(cache, translation, digest, store):
+    path = cache_path(cache, translation, digest)
+    store.save(path)
+    # Only the entry for the current content of each file is worth keeping
+    for stale in glob.glob(os.path.join(glob.escape(cache), f"{translation[0]}-*.vstore")):
+        if stale != path:
+            os.remove(stale)
+
+def clear_cache(cache):
+    for path in glob.glob(os.path.join(glob.escape(cache), "*.vstore")):
+        os.remove(path)
+
+def load_verse_stores(jobs, cache=None, books=None):
+    """Load every translation, parsing only what the cache does not already hold.
+
+    Unchanged files are mapped straight from their cached .vstore. The rest are
+    parsed independently, fanned out to a process pool when jobs > 1, so the
+    wall-clock time approaches that of the slowest single file. Workers send
+    back packed VerseStores, which pickle as a few flat buffers. jobs=1 keeps
+    the serial path for comparison. With books, only those books are read
+    (through the book index) and the whole-file cache is bypassed.
+    """
+    stores = [None] * len(translations)
+    digests = [None] * len(translations)
+    if books is not None:
+        cache = None
+    if cache:
+        os.makedirs(cache, exist_ok=True)
+        for i, translation in enumerate(translations):
+            digests[i] = source_digest(translation)
+            path = cache_path(cache, translation, digests[i])
+            if os.path.exists(path):
+                stores[i] = VerseStore.open(path)
+                print(f"Loaded {translation[1]} from cache")
+
+    todo = [i for i, store in enumerate(stores) if store is None]
+    if jobs <= 1 or len(todo) <= 1:
+        parsed = [parse_translation(translations[i], books) for i in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(todo))) as pool:
+            parsed = list(pool.map(parse_translation, [translations[i] for i in todo], [books] * len(todo)))
+
+    for i, store in zip(todo, parsed):
+        stores[i] = store
+        if cache:
+            save_to_cache(cache, translations[i], digests[i], store)
+    return stores
+
+def book_number(bname):
+    # Unknown books sort after Revelation
+    return book_numbers.get(bname, len(book_numbers) + 1)
+
+def verse_key(record):
+    bname, cnum, vnum = record[:3]
+    return book_number(bname), int(cnum), int(vnum)
+
+def canonical_order(records, book_order):
+    """Re-yield a translation's verse records in (book number, chapter, verse) order.
+
+    book_order lists the books the file holds, in file order (see
+    load_book_index). Records of the next book due are passed straight
+    through, so a file whose books are already in canonical order is never
+    buffered, however many books it lacks. Only books that arrive ahead of
+    their turn (e.g. a file that lists the New Testament first) are held, and
+    released once every earlier book has gone by. Verses within a book that
+    is passed through must already be in order; ValueError otherwise.
+    """
+    due = sorted({book_number(bname) for bname in book_order})
+    pos = 0
+    pending = {}
+    streaming = last_key = None
+    for record in records:
+        bnum = book_number(record[0])
+        if streaming is not None and bnum != streaming:
+            streaming = None
+            pos += 1
+            while pos < len(due) and due[pos] in pending:
+                yield from sorted(pending.pop(due[pos]), key=verse_key)
+                pos += 1
+        if streaming is None and pos < len(due) and bnum == due[pos]:
+            streaming, last_key = bnum, None
+        if bnum == streaming:
+            key = verse_key(record)
+            if last_key is not None and key < last_key:
+                raise ValueError(f"{record[0]} {record[1]}:{record[2]} comes after verse {last_key[1]}:{last_key[2]}")
+            last_key = key
+            yield record
+        else:
+            pending.setdefault(bnum, []).append(record)
+    for bnum in sorted(pending):
+        yield from sorted(pending[bnum], key=verse_key)
+
+def merge_join(streams):
+    """Advance canonically ordered verse streams in lockstep (k-way merge-join).
+
+    Yields (book, chapter, verse, texts) for every verse found in at least one
+    stream, with "" in texts where a translation lacks it. Consecutive records
+    of one stream with the same reference (verses a versification table maps
+    together) are joined. Only the current record of each stream is held, so
+    adding languages does not add memory.
+    """
+    iters = [iter(s) for s in streams]
+    heads = [next(it, None) for it in iters]
+    keys = [verse_key(h) if h else None for h in heads]
+    while any(k is not None for k in keys):
+        key = min(k for k in keys if k is not None)
+        record = None
+        texts = []
+        for i, it in enumerate(iters):
+            parts = []
+            while keys[i] == key:
+                record = heads[i]
+                parts.append(record[3])
+                heads[i] = next(it, None)
+                keys[i] = verse_key(heads[i]) if heads[i] else None
+            texts.append(" ".join(p for p in parts if p))
+        yield record[0], record[1], record[2], texts
+
+def primary_store(stores):
+    return stores[[t[0] for t in translations].index(primary_language)]
+
+def merge_verse_stores(stores, bname=None):
+    """Walk the primary translation's verses and look the others up by verse index."""
+    for index, bname, cnum, vnum in primary_store(stores).references(bname):
+        yield bname, cnum, vnum, [s.lookup(index, bname, cnum, vnum) for s in stores]
+
+def format_range(start, end):
+    """'Mark 16:9-20', 'Mark 15:40-16:3' or 'Mark 16:9' for dense indexes within one book."""
+    b, c1, v1 = verse_ref(start)
+    _, c2, v2 = verse_ref(end)
+    if start == end:
+        return f"{book_names[b]} {c1}:{v1}"
+    if c1 == c2:
+        return f"{book_names[b]} {c1}:{v1}-{v2}"
+    return f"{book_names[b]} {c1}:{v1}-{c2}:{v2}"
+
+class Coverage:
+    """Verse index x language matrix of which translations have text for each merged verse.
+
+    scope marks the verses that appear in the merged output; rows[i] marks the
+    verses language i has non-empty text for. Both are bytearrays with one byte
+    per canonical verse, so the summaries below are bulk operations over whole
+    rows rather than per-verse strings. Non-canonical verses go in `extra`.
+    """
+
+    def __init__(self, codes, scope=None, rows=None, extra=None):
+        self.codes = list(codes)
+        self.scope = scope if scope is not None else bytearray(verse_count)
+        self.rows = rows if rows is not None else [bytearray(verse_count) for _ in self.codes]
+        self.extra = extra if extra is not None else {}
+
+    @classmethod
+    def from_stores(cls, stores):
+        primary = primary_store(stores)
+        rows = []
+        for store in stores:
+            offsets = store.offsets
+            rows.append(bytearray(map(int.__lt__, offsets[:-1], offsets[1:])))
+        extra = {key: tuple(int(bool(store.extra.get(key))) for store in stores) for key in primary.extra}
+        return cls([t[0] for t in translations], bytearray(primary.present), rows, extra)
+
+    def track(self, merged):
+        """Fill the matrix from (book, chapter, verse, texts) records as they stream past."""
+        for record in merged:
+            bname, cnum, vnum, texts = record
+            index = verse_index(book_number(bname), int(cnum), int(vnum))
+            if index is None:
+                self.extra[(bname, cnum, vnum)] = tuple(int(bool(text)) for text in texts)
+            else:
+                self.scope[index] = 1
+                for row, text in zip(self.rows, texts):
+                    if text:
+                        row[index] = 1
+            yield record
+
+    def missing(self, lang):
+        """Row with 1 where the verse is in scope but the language has no text."""
+        scope = int.from_bytes(self.scope, "little")
+        present = int.from_bytes(self.rows[lang], "little")
+        return (scope & ~present).to_bytes(verse_count, "little")
+
+    def missing_ranges(self, lang):
+        """Contiguous (start, end) index runs of missing verses, split at book boundaries."""
+        ranges = []
+        for run in re.finditer(b"\x01+", self.missing(lang)):
+            start, end = run.start(), run.end() - 1
+            while index_book_end(start) <= end:
+                ranges.append((start, index_book_end(start) - 1))
+                start = index_book_end(start)
+            ranges.append((start, end))
+        return ranges
+
+    def report(self):
+        labels = {t[0]: t[1] for t in translations}
+        names = [labels.get(code, code) for code in self.codes]
+        missing = [self.missing(lang) for lang in range(len(self.codes))]
+        lines = ["== Missing verses =="]
+        for lang, name in enumerate(names):
+            lines.extend(f"{name} missing {format_range(s, e)}" for s, e in self.missing_ranges(lang))
+            lines.extend(f"{name} missing {b} {c}:{v}" for (b, c, v), flags in self.extra.items() if not flags[lang])
+
+        lines.append(f"== Gaps per book ({', '.join(names)}) ==")
+        for bnum in chapter_verses:
+            start, end = book_bounds(bnum)
+            counts = [row[start:end].count(1) for row in missing]
+            if any(counts):
+                lines.append(f"{book_names[bnum]}: {' '.join(map(str, counts))}")
+
+        lines.append(f"== Gaps per chapter ({', '.join(names)}) ==")
+        for bnum, starts in chapter_start.items():
+            for chapter, start in enumerate(starts, 1):
+                end = start + chapter_verses[bnum][chapter - 1]
+                counts = [row[start:end].count(1) for row in missing]
+                if any(counts):
+                    lines.append(f"{book_names[bnum]} {chapter}: {' '.join(map(str, counts))}")
+
+        lines.append("== Language pairs (verses the first has that the second is missing) ==")
+        scope = int.from_bytes(self.scope, "little")
+        bits = [int.from_bytes(row, "little") & scope for row in self.rows]
+        for a, name_a in enumerate(names):
+            for b, name_b in enumerate(names):
+                diff = (bits[a] & ~bits[b]).bit_count()
+                diff += sum(1 for flags in self.extra.values() if flags[a] and not flags[b])
+                if a != b and diff:
+                    lines.append(f"{name_a} / {name_b}: {diff}")
+        return lines
+
+    def save(self, path):
+        codes = ",".join(self.codes).encode("ascii")
+        extra = json.dumps([[*key, list(flags)] for key, flags in self.extra.items()], ensure_ascii=False)
+        with open(path, "wb") as f:
+            f.write(coverage_header.pack(coverage_magic, coverage_format_version, len(codes), verse_count))
+            f.write(codes)
+            f.write(self.scope)
+            for row in self.rows:
+                f.write(row)
+            f.write(extra.encode("utf-8"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, codes_size, count = coverage_header.unpack_from(data)
+        if magic != coverage_magic or version not in (1, coverage_format_version) or count != verse_count:
+            raise ValueError(f"{path} is not a version {coverage_format_version} coverage matrix")
+        pos = coverage_header.size
+        codes = data[pos:pos + codes_size].decode("ascii").split(",")
+        pos += codes_size
+        rows = [bytearray(data[pos + i * count:pos + (i + 1) * count]) for i in range(len(codes) + 1)]
+        pos += count * (len(codes) + 1)
+        # Version 1 files stop after the rows and have no extras
+        extra = {(b, c, v): tuple(flags) for b, c, v, flags in json.loads(data[pos:].decode("utf-8") or "[]")}
+        return cls(codes, rows[0], rows[1:], extra)
+
+def index_book_end(index):
+    return book_bounds(verse_ref(index)[0])[1]
+
+def escape_text(s):
+    return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+def escape_attribute(s):
+    s = escape_text(s).replace("\"", "&quot;")
+    return s.replace("\r", "&#13;").replace("\n", "&#10;").replace("\t", "&#09;")
+
+def start_tag(tag, attributes):
+    attrs = "".join(f' {k}="{escape_attribute(v)}"' for k, v in attributes.items())
+    return f"<{tag}{attrs}>"
+
+class OsisWriter:
+    """Write an OSIS document straight to a file as verses are produced.
+
+    The header goes out immediately, book divs and chapters are opened and
+    closed as the references change, and each verse is written on arrival, so
+    the merged Bible never exists as a tree. The bytes match what
+    ElementTree.write() produced for the same document.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.book = self.chapter = None
+
+    def header(self, title=osis_title, language=osis_language):
+        self.f.write("<?xml version='1.0' encoding='utf-8'?>\n")
+        self.f.write(start_tag("osis", osis_attributes))
+        self.f.write(f"<header><work>{escape_text(title)}</work><title>{escape_text(title)}</title>"
+                     f"<language>{escape_text(language)}</language></header>")
+        self.f.write(start_tag("osisText", {"osisIDWork": "MergedBible", "language": language}))
+
+    def close_book(self):
+        if self.chapter is not None:
+            self.f.write("</chapter>")
+        if self.book is not None:
+            self.f.write("</div>")
+        self.book = self.chapter = None
+
+    def verse(self, bname, cnum, vnum, text):
+        self.verse_markup(bname, cnum, vnum, escape_text(text))
+
+    def verse_markup(self, bname, cnum, vnum, markup, attributes=None):
+        """Write a verse whose content is already-escaped markup, with optional extra attributes."""
+        if bname != self.book:
+            self.close_book()
+            self.f.write(start_tag("div", {"type": "book", "osisID": bname}))
+            self.book = bname
+        if cnum != self.chapter:
+            if self.chapter is not None:
+                self.f.write("</chapter>")
+            self.f.write(start_tag("chapter", {"osisID": f"{bname}.{cnum}"}))
+            self.chapter = cnum
+        attrs = {"osisID": f"{bname}.{cnum}.{vnum}", **(attributes or {})}
+        self.f.write(f'{start_tag("verse", attrs)}{markup}</verse>')
+
+    def footer(self):
+        self.close_book()
+        self.f.write("</osisText></osis>")
+
+def inline_verse_text(cnum, vnum, codes, texts):
+    return " ".join(
+        f"{{lang-{code}}}<sup>{cnum}:{vnum}</sup>{text}{{/lang-{code}}}"
+        for code, text in zip(codes, texts)
+    )
+
+def plain_verse_text(cnum, vnum, codes, texts):
+    """Language markers only, for layouts that show the reference themselves."""
+    return " ".join(f"{{lang-{code}}}{text}{{/lang-{code}}}" for code, text in zip(codes, texts))
+
+def text_markup(verse_text):
+    """Markup style that writes verse_text() as the verse's escaped text content."""
+    def markup(cnum, vnum, codes, texts):
+        return None, escape_text(verse_text(cnum, vnum, codes, texts))
+    return markup
+
+seg_tags = {code: start_tag("seg", {"xml:lang": lang}) for code, lang in xml_languages.items()}
+
+def lean_verse_markup(cnum, vnum, codes, texts):
+    """One <seg xml:lang="..."> child per language that has the verse; the label is only the n attribute."""
+    segs = "".join(f"{seg_tags[code]}{escape_text(text)}</seg>" for code, text in zip(codes, texts) if text)
+    return {"n": f"{cnum}:{vnum}"}, segs
+
+# --- Markup styles: (chapter, verse, codes, texts) -> (extra verse attributes, verse content) ---
+markup_styles = {
+    "inline": text_markup(inline_verse_text),
+    "plain": text_markup(plain_verse_text),
+    "lean": lean_verse_markup,
+}
+
+def merged_verse_text(cnum, vnum, texts):
+    return inline_verse_text(cnum, vnum, [t[0] for t in translations], texts)
+
+def write_verses(writer, merged):
+    """Write (book, chapter, verse, texts) records."""
+    for bname, cnum, vnum, texts in merged:
+        writer.verse(bname, cnum, vnum, merged_verse_text(cnum, vnum, texts))
+
+def parse_books(text):
+    """'Romans,1 Corinthians' -> canonical book names, in canonical order."""
+    books = [normalize_book_name(name.strip()) for name in text.split(",") if name.strip()]
+    for bname in books:
+        if bname not in book_numbers:
+            raise argparse.ArgumentTypeError(f"unknown book {bname!r}")
+    return sorted(set(books), key=book_number)
+
+def parse_output_spec(text):
+    """'eng,tel:EngTel.osis.xml[:style]' -> (language codes, file name, markup style)."""
+    codes, sep, rest = text.partition(":")
+    path, _, style = rest.rpartition(":")
+    if style not in markup_styles:
+        path, style = rest, "inline"
+    codes = [c.strip() for c in codes.split(",") if c.strip()]
+    known = [t[0] for t in translations]
+    if not sep or not path or not codes:
+        raise argparse.ArgumentTypeError(f"expected LANGS:FILE[:STYLE], got {text!r}")
+    for code in codes:
+        if code not in known:
+            raise argparse.ArgumentTypeError(f"unknown language {code!r} (choose from {', '.join(known)})")
+    return codes, path, style
+
+def write_output(spec, batches):
+    """Writer thread for one output spec: write each batch of merged records as it arrives.
+
+    The file is built in path + ".tmp" and moved over path only once the end
+    of the records (None) arrives; on output_aborted or an error the previous
+    file is left as it was.
+    """
+    codes, path, style = spec
+    labels = {t[0]: t[1] for t in translations}
+    columns = [[t[0] for t in translations].index(code) for code in codes]
+    verse_markup = markup_styles[style]
+    tmp_path = path + ".tmp"
+    ended = False
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+            writer = OsisWriter(f)
+            writer.header(f"Merged {'-'.join(labels[c] for c in codes)} Bible", "-".join(c.upper() for c in codes))
+            for batch in iter(batches.get, None):
+                if batch is output_aborted:
+                    ended = True
+                    return
+                for bname, cnum, vnum, texts in batch:
+                    attributes, markup = verse_markup(cnum, vnum, codes, [texts[i] for i in columns])
+                    writer.verse_markup(bname, cnum, vnum, markup, attributes)
+            ended = True
+            writer.footer()
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Keep draining so the producer never blocks on a full queue
+        if not ended:
+            for batch in iter(batches.get, None):
+                if batch is output_aborted:
+                    break
+        raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def write_outputs(merged, specs):
+    """Write every output spec from a single pass over the merged records.
+
+    Each output has its own writer thread fed through a bounded queue, so all
+    files are written concurrently while only a few batches are held in memory.
+    If the merged records fail part-way, the writers are aborted and no
+    output is replaced.
+    """
+    queues = [queue.Queue(maxsize=4) for _ in specs]
+    with ThreadPoolExecutor(max_workers=len(specs)) as pool:
+        futures = [pool.submit(write_output, spec, q) for spec, q in zip(specs, queues)]
+        batch = []
+        try:
+            for record in merged:
+                batch.append(record)
+                if len(batch) >= output_batch_size:
+                    for q in queues:
+                        q.put(batch)
+                    batch = []
+            for q in queues:
+                q.put(batch)
+        except BaseException:
+            for q in queues:
+                q.put(output_aborted)
+            raise
+        for q in queues:
+            q.put(None)
+        for future in futures:
+            future.result()
+
+def write_osis_incremental(stores, path, changed=None):
+    """Regenerate only the book sections whose inputs changed since the last run.
+
+    Each book div lives in its own shard file next to the output, and a
+    manifest records every language's book_digest() for it. Books whose hashes
+    still match are reused as-is; the output is then stitched from the shards
+    and is byte-identical to write_outputs() with the default output. If
+    `changed` names the books known to differ (e.g. from a BibleDiff report),
+    every other book that already has a shard is reused without hashing it.
+    Returns the number of books rebuilt.
+    """
+    shard_dir = path + ".d"
+    manifest_path = os.path.join(shard_dir, "manifest.json")
+    layout = {"languages": [t[0] for t in translations], "primary": primary_language,
+              "format": osis_format_version}
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    previous = manifest.get("books", {}) if manifest.get("layout") == layout else {}
+    os.makedirs(shard_dir, exist_ok=True)
+
+    books = {}
+    rebuilt = 0
+    for bname in primary_store(stores).books():
+        shard = f"{book_number(bname):02d}-{bname}.xml"
+        entry = previous.get(bname)
+        if changed is not None and bname not in changed and entry and os.path.exists(os.path.join(shard_dir, shard)):
+            books[bname] = entry
+            continue
+        hashes = [store.book_digest(bname) for store in stores]
+        if entry is None or entry["hashes"] != hashes or not os.path.exists(os.path.join(shard_dir, shard)):
+            write_book_shard(stores, bname, os.path.join(shard_dir, shard))
+            entry = {"shard": shard, "hashes": hashes}
+            rebuilt += 1
+        books[bname] = entry
+
+    shards = {entry["shard"] for entry in books.values()}
+    for name in os.listdir(shard_dir):
+        if name.endswith(".xml") and name not in shards:
+            os.remove(os.path.join(shard_dir, name))
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"layout": layout, "books": books}, f, ensure_ascii=False, indent=1)
+
+    stitch_shards(path, [os.path.join(shard_dir, entry["shard"]) for entry in books.values()])
+    return rebuilt
+
+def write_book_shard(stores, bname, path, standalone=False):
+    """Write one book's div to its own file; standalone adds the OSIS header and footer."""
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        writer = OsisWriter(f)
+        if standalone:
+            writer.header()
+        write_verses(writer, merge_verse_stores(stores, bname))
+        if standalone:
+            writer.footer()
+        else:
+            writer.close_book()
+
+def stitch_shards(path, shards):
+    """Concatenate book div shards, in the given order, into one OSIS document."""
+    with open(path, "w", encoding="utf-8", newline="\n") as out:
+        writer = OsisWriter(out)
+        writer.header()
+        for shard in shards:
+            with open(shard, encoding="utf-8", newline="") as f:
+                shutil.copyfileobj(f, out)
+        writer.footer()
+
+shard_stores = None
+
+def init_shard_worker(stores):
+    global shard_stores
+    shard_stores = stores
+
+def shard_worker(bname, path, standalone):
+    write_book_shard(shard_stores, bname, path, standalone)
+    return path
+
+def write_osis_sharded(stores, path, jobs, mode="stitch"):
+    """Serialize every book in a pool of worker processes, one shard file per book.
+
+    Workers get the stores once, when they start, and then only a book name
+    per task. In "stitch" mode the shards are book divs that the parent joins
+    in canonical order into a document byte-identical to write_outputs() with
+    the default output, then removes. In "books" mode each shard is a complete OSIS document and they
+    are left in path + ".books" instead.
+    Returns the shard directory.
+    """
+    standalone = mode == "books"
+    shard_dir = path + (".books" if standalone else ".shards")
+    os.makedirs(shard_dir, exist_ok=True)
+    books = primary_store(stores).books()
+    shards = [os.path.join(shard_dir, f"{book_number(bname):02d}-{bname}.xml") for bname in books]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_shard_worker, initargs=(stores,)) as pool:
+        list(pool.map(shard_worker, books, shards, [standalone] * len(books)))
+    if not standalone:
+        stitch_shards(path, shards)
+        shutil.rmtree(shard_dir)
+    return shard_dir
+
+def write_openlp_db(path, name, verses, batch_size=5000):
+    """Write (book, chapter, verse, text) records as an OpenLP bible database.
+
+    Uses OpenLP's bible schema (metadata, book, verse), so the file can be
+    dropped into OpenLP's bibles folder without an import. All rows go in
+    through batched executemany calls in one transaction, and the indexes are
+    built afterwards.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    db = sqlite3.connect(path)
+    try:
+        with db:
+            db.executescript("""
+                CREATE TABLE metadata (key VARCHAR(255) NOT NULL PRIMARY KEY, value VARCHAR(255));
+                CREATE TABLE book (id INTEGER NOT NULL PRIMARY KEY, book_reference_id INTEGER,
+                                   testament_reference_id INTEGER, name VARCHAR(50));
+                CREATE TABLE verse (id INTEGER NOT NULL PRIMARY KEY, book_id INTEGER REFERENCES book (id),
+                                    chapter INTEGER, verse INTEGER, text TEXT);
+            """)
+            db.executemany("INSERT INTO metadata (key, value) VALUES (?, ?)", [
+                ("name", name), ("Version", name), ("dbversion", "2"), ("Copyright", ""), ("Permissions", ""),
+            ])
+            book_ids = {}
+            batch = []
+            for bname, cnum, vnum, text in verses:
+                if bname not in book_ids:
+                    book_ids[bname] = len(book_ids) + 1
+                    bnum = book_number(bname)
+                    db.execute("INSERT INTO book (id, book_reference_id, testament_reference_id, name) "
+                               "VALUES (?, ?, ?, ?)", (book_ids[bname], bnum, 1 if bnum <= 39 else 2, bname))
+                batch.append((book_ids[bname], int(cnum), int(vnum), text))
+                if len(batch) >= batch_size:
+                    db.executemany("INSERT INTO verse (book_id, chapter, verse, text) VALUES (?, ?, ?, ?)", batch)
+                    batch.clear()
+            db.executemany("INSERT INTO verse (book_id, chapter, verse, text) VALUES (?, ?, ?, ?)", batch)
+            db.executescript("""
+                CREATE INDEX ix_metadata_key ON metadata (key);
+                CREATE INDEX ix_book_book_reference_id ON book (book_reference_id);
+                CREATE INDEX ix_book_name ON book (name);
+                CREATE INDEX ix_verse_book_id ON verse (book_id);
+                CREATE INDEX ix_verse_chapter ON verse (chapter);
+                CREATE INDEX ix_verse_verse ON verse (verse);
+                CREATE INDEX ix_verse_text ON verse (text);
+            """)
+    finally:
+        db.close()
+
+def export_openlp(stores, directory, mode):
+    """Write the combined bible and/or one bible per language as OpenLP databases."""
+    os.makedirs(directory, exist_ok=True)
+    if mode in ("combined", "both"):
+        verses = ((bname, cnum, vnum, merged_verse_text(cnum, vnum, texts))
+                  for bname, cnum, vnum, texts in merge_verse_stores(stores))
+        write_openlp_db(os.path.join(directory, "MergedBible.sqlite"), osis_title, verses)
+    if mode in ("languages", "both"):
+        for (code, label, _, _), store in zip(translations, stores):
+            verses = ((bname, cnum, vnum, store.lookup(index, bname, cnum, vnum))
+                      for index, bname, cnum, vnum in store.references())
+            write_openlp_db(os.path.join(directory, f"{label}Bible.sqlite"), f"{label} Bible", verses)
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the Bible translations into one OSIS file.")
+    parser.add_argument("--merge-join", action="store_true",
+                        help="stream every translation in canonical order and merge them in lockstep "
+                             "instead of loading them all into memory first")
+    parser.add_argument("--jobs", type=int, default=min(len(translations), os.cpu_count() or 1),
+                        help="number of processes used to parse the translations (1 = serial)")
+    parser.add_argument("--export-binary", metavar="DIR", nargs="?", const=store_dir,
+                        help=f"also save each translation as a memory-mappable <code>.vstore file in DIR "
+                             f"(default: {store_dir})")
+    parser.add_argument("--cache-dir", default=cache_dir,
+                        help=f"where parsed translations are cached by content hash (default: {cache_dir})")
+    parser.add_argument("--no-cache", action="store_true", help="always re-parse every translation")
+    parser.add_argument("--clear-cache", action="store_true", help="empty the parse cache before running")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only regenerate the books whose inputs changed, using per-book shards "
+                             f"and a manifest in {output_file}.d")
+    parser.add_argument("--openlp", choices=("combined", "languages", "both"),
+                        help="also write OpenLP bible databases: the merged bible, one per language, or both")
+    parser.add_argument("--openlp-dir", default=openlp_dir,
+                        help=f"where the OpenLP databases are written (default: {openlp_dir})")
+    parser.add_argument("--output", metavar="LANGS:FILE[:STYLE]", action="append", type=parse_output_spec,
+                        help="write an OSIS file with only these languages, e.g. eng,tel:EngTel.osis.xml:plain; "
+                             f"repeat for more outputs. STYLE is one of {', '.join(markup_styles)} (default: inline). "
+                             f"Default: all languages to {output_file}")
+    parser.add_argument("--books", type=parse_books,
+                        help="comma-separated English book names to merge, e.g. Romans,Galatians; only "
+                             f"those books are read from each file, using a {book_index_suffix} byte index. "
+                             "Needs --output; the report and coverage matrix are saved next to the first output")
+    parser.add_argument("--sharded", nargs="?", const="stitch", choices=("stitch", "books"),
+                        help="serialize each book in a worker process (--jobs of them): 'stitch' (default) joins "
+                             f"the shards into {output_file}, 'books' leaves one OSIS file per book in "
+                             f"{output_file}.books")
+    parser.add_argument("--diff", metavar="FILE",
+                        help="with --incremental, a BibleDiff --json report; only the books it lists are re-merged")
+    args = parser.parse_args()
+    if args.diff and not args.incremental:
+        parser.error("--diff needs --incremental")
+    if args.sharded and (args.merge_join or args.incremental or args.output):
+        parser.error(f"--sharded writes only {output_file} from the verse stores, so it cannot be combined "
+                     "with --merge-join, --incremental or --output")
+    if args.books and (args.export_binary or args.incremental or args.openlp or args.sharded):
+        parser.error("--books writes a partial Bible, so it cannot be combined with "
+                     "--export-binary, --incremental, --openlp or --sharded")
+    if args.books and not args.output:
+        parser.error(f"--books writes a partial Bible, so it needs --output rather than overwriting {output_file}")
+    if args.incremental and args.output:
+        parser.error(f"--incremental only rebuilds {output_file}, so it cannot be combined with --output")
+    specs = args.output or [([t[0] for t in translations], output_file, "inline")]
+    if args.merge_join and (args.export_binary or args.incremental or args.openlp):
+        parser.error("--export-binary, --incremental and --openlp need the verse stores, "
+                     "so they cannot be combined with --merge-join")
+
+    if args.clear_cache and os.path.isdir(args.cache_dir):
+        clear_cache(args.cache_dir)
+        print(f"Cleared parse cache in {args.cache_dir}")
+
+    if args.merge_join:
+        streams = []
+        for code, _, path, version in translations:
+            records = iter_selected_verses(path, version, args.books)
+            book_order = list(load_book_index(path))
+            if args.books:
+                book_order = [bname for bname in book_order if bname in args.books]
+            verse_map = load_verse_map(code)
+            streams.append(canonical_order(map_records(records, verse_map) if verse_map else records, book_order))
+        coverage = Coverage(t[0] for t in translations)
+        merged = coverage.track(merge_join(streams))
+    else:
+        # --- Build verse stores ---
+        start = time.perf_counter()
+        stores = load_verse_stores(args.jobs, None if args.no_cache else args.cache_dir, args.books)
+        print(f"Loaded {len(translations)} translations in {time.perf_counter() - start:.2f}s "
+              f"({'serial' if args.jobs <= 1 else f'{args.jobs} jobs'})")
+        if args.export_binary:
+            os.makedirs(args.export_binary, exist_ok=True)
+            for (code, _, _, _), store in zip(translations, stores):
+                store.save(os.path.join(args.export_binary, f"{code}.vstore"))
+            print(f"Binary verse stores saved to {args.export_binary}")
+        if args.openlp:
+            start = time.perf_counter()
+            export_openlp(stores, args.openlp_dir, args.openlp)
+            print(f"OpenLP bibles saved to {args.openlp_dir} in {time.perf_counter() - start:.2f}s")
+        coverage = Coverage.from_stores(stores)
+        merged = merge_verse_stores(stores)
+
+    # --- Merge all verses and write output ---
+    if args.incremental:
+        changed = None
+        if args.diff:
+            with open(args.diff, encoding="utf-8") as f:
+                changed = set(json.load(f)["books"])
+        rebuilt = write_osis_incremental(stores, output_file, changed)
+        print(f"Rebuilt {rebuilt} of {len(primary_store(stores).books())} books")
+    elif args.sharded:
+        start = time.perf_counter()
+        shard_dir = write_osis_sharded(stores, output_file, max(args.jobs, 1), args.sharded)
+        print(f"Serialized {len(primary_store(stores).books())} books with {max(args.jobs, 1)} jobs "
+              f"in {time.perf_counter() - start:.2f}s")
+        if args.sharded == "books":
+            specs = []
+            print(f"Per-book OSIS files saved to {shard_dir}")
+    else:
+        start = time.perf_counter()
+        write_outputs(merged, specs)
+        print(f"Wrote {len(specs)} output(s) in {time.perf_counter() - start:.2f}s")
+
+    # --- Write missing-verse report and coverage matrix ---
+    # A partial Bible's report goes next to its first output, leaving the full Bible's untouched
+    report_file, matrix_file = log_file, coverage_file
+    if args.books:
+        report_file, matrix_file = args.output[0][1] + ".warnings.log", args.output[0][1] + ".coverage"
+    with open(report_file, "w", encoding="utf-8") as f:
+        for line in coverage.report():
+            f.write(line + "\n")
+    coverage.save(matrix_file)
+
+    for codes, path, style in specs:
+        print(f"Merged OSIS Bible ({'+'.join(codes)}, {style}) saved to {path}")
+    print(f"Missing-verse report saved to {report_file}, coverage matrix to {matrix_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import math
+import os
+import re
+import time
+import unicodedata
+from array import array
+
+from BibleOsisExport import VerseStore, book_names, store_dir, translations
+from Versification import verse_count, verse_ref
+
+# --- Tokenizer ---
+# \w alone splits Telugu, Tamil and Devanagari words at every vowel sign and virama
+# (they are combining marks, not letters), so those blocks are matched explicitly.
+# The Devanagari dandas (U+0964, U+0965) stay punctuation.
+token_re = re.compile(r"(?:[^\W_]|[\u0900-\u0963\u0966-\u097F\u0B80-\u0BFF\u0C00-\u0C7F\u200c\u200d])+")
+
+# --- BM25 ranking ---
+k1 = 1.2
+b = 0.75
+
+def tokenize(text):
+    text = unicodedata.normalize("NFC", text).casefold()
+    return [t.replace("\u200c", "").replace("\u200d", "") for t in token_re.findall(text)]
+
+def parse_query(query):
+    """Split a query into plain words and "quoted phrases" (each a token list)."""
+    phrases = [tokenize(p) for p in re.findall(r'"([^"]+)"', query)]
+    words = tokenize(re.sub(r'"[^"]*"', " ", query))
+    return words, [p for p in phrases if p]
+
+def append_varint(buf, n):
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+def decode_postings(data):
+    """Yield (verse id, term frequency) from delta-encoded varint pairs."""
+    doc = 0
+    values = []
+    n = shift = 0
+    for byte in data:
+        n |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(n)
+        n = shift = 0
+        if len(values) == 2:
+            doc += values[0]
+            yield doc, values[1]
+            values.clear()
+
+class LanguageIndex:
+    """Inverted index over one translation's VerseStore.
+
+    Verse ids are the dense verse indexes, followed by the store's extra
+    verses. Each term's postings are (id delta, term frequency) varint pairs in
+    one bytearray.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.extra_keys = list(store.extra)
+        self.postings = {}
+        self.lengths = array("H")
+        last = {}
+        for doc, text in self.documents():
+            tokens = tokenize(text)
+            self.lengths.append(min(len(tokens), 0xFFFF))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                buf = self.postings.get(token)
+                if buf is None:
+                    buf = self.postings[token] = bytearray()
+                append_varint(buf, doc - last.get(token, 0))
+                append_varint(buf, tf)
+                last[token] = doc
+        self.doc_count = sum(1 for n in self.lengths if n)
+        self.average_length = sum(self.lengths) / max(self.doc_count, 1)
+
+    def documents(self):
+        for i in range(verse_count):
+            yield i, self.store.text(i) if self.store.present[i] else ""
+        for j, key in enumerate(self.extra_keys):
+            yield verse_count + j, self.store.extra[key]
+
+    def reference(self, doc):
+        if doc < verse_count:
+            bnum, c, v = verse_ref(doc)
+            return book_names[bnum], str(c), str(v), self.store.text(doc)
+        key = self.extra_keys[doc - verse_count]
+        return (*key, self.store.extra[key])
+
+    def search(self, words, phrases):
+        """Ranked AND of every word and phrase token; phrases are checked against the verse text."""
+        terms = set(words)
+        for phrase in phrases:
+            terms.update(phrase)
+        if not terms or any(t not in self.postings for t in terms):
+            return []
+        lists = sorted((dict(decode_postings(self.postings[t])) for t in terms), key=len)
+        candidates = set(lists[0])
+        for postings in lists[1:]:
+            candidates.intersection_update(postings)
+            if not candidates:
+                return []
+
+        results = []
+        for doc in candidates:
+            bname, cnum, vnum, text = self.reference(doc)
+            if phrases:
+                tokens = tokenize(text)
+                if not all(contains_phrase(tokens, phrase) for phrase in phrases):
+                    continue
+            norm = k1 * (1 - b + b * self.lengths[doc] / self.average_length)
+            score = 0.0
+            for postings in lists:
+                tf = postings[doc]
+                idf = math.log(1 + (self.doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + norm)
+            results.append((score, doc, bname, cnum, vnum, text))
+        return results
+
+def contains_phrase(tokens, phrase):
+    n = len(phrase)
+    return any(tokens[i:i + n] == phrase for i in range(len(tokens) - n + 1))
+
+class BibleSearch:
+    """Full-text search over the exported verse stores of every translation."""
+
+    def __init__(self, directory=store_dir, languages=None):
+        self.indexes = {}
+        for code in languages or [t[0] for t in translations]:
+            path = os.path.join(directory, f"{code}.vstore")
+            if os.path.exists(path):
+                self.indexes[code] = LanguageIndex(VerseStore.open(path))
+
+    def search(self, query, languages=None, limit=10):
+        """Best matches as (score, language, book, chapter, verse, text), highest score first."""
+        words, phrases = parse_query(query)
+        results = []
+        for code, index in self.indexes.items():
+            if languages and code not in languages:
+                continue
+            for score, doc, bname, cnum, vnum, text in index.search(words, phrases):
+                results.append((score, code, doc, bname, cnum, vnum, text))
+        results.sort(key=lambda r: (-r[0], r[2], r[1]))
+        return [(score, code, bname, cnum, vnum, text) for score, code, _, bname, cnum, vnum, text in results[:limit]]
+
+def print_results(results, elapsed):
+    for score, code, bname, cnum, vnum, text in results:
+        print(f"{score:6.2f} [{code}] {bname} {cnum}:{vnum} {text}")
+    print(f"({len(results)} results in {elapsed * 1000:.1f} ms)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the exported verse stores by word or \"phrase\".")
+    parser.add_argument("query", nargs="*",
+                        help="words to AND together; an argument with spaces is a phrase. Omit for a prompt.")
+    parser.add_argument("--lang", help="comma-separated language codes to search (default: all)")
+    parser.add_argument("--limit", type=int, default=10, help="number of results to show (default: 10)")
+    parser.add_argument("--stores", default=store_dir, help=f"directory of .vstore files (default: {store_dir})")
+    args = parser.parse_args()
+
+    languages = args.lang.split(",") if args.lang else None
+    start = time.perf_counter()
+    index = BibleSearch(args.stores, languages)
+    print(f"Indexed {', '.join(index.indexes) or 'nothing'} in {time.perf_counter() - start:.2f}s")
+
+    if args.query:
+        start = time.perf_counter()
+        # An argument with spaces in it is a phrase
+        query = " ".join(f'"{q}"' if " " in q and '"' not in q else q for q in args.query)
+        results = index.search(query, languages, args.limit)
+        print_results(results, time.perf_counter() - start)
+        return
+    while True:
+        try:
+            query = input("search> ").strip()
+        except EOFError:
+            break
+        if not query:
+            break
+        start = time.perf_counter()
+        results = index.search(query, languages, args.limit)
+        print_results(results, time.perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
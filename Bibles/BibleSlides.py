@@ -0,0 +1,348 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import time
+import unicodedata
+from array import array
+from collections import Counter
+
+from BibleOsisExport import VerseStore, store_dir, translations
+from Versification import verse_count
+
+# --- Stage fonts and layouts ---
+fonts_dir = os.path.join("..", "stages", "fonts")
+# Stage CSS sizes are in vw/vh; they are resolved against this screen
+screen_width = 1920
+screen_height = 1080
+# profile: (font file, font size px, text box width px, text box height px), from each stage's CSS
+layout_profiles = {
+    "Bible-LowerThird": ("kingthings-clarity.kingthings-clarity.ttf",
+                         0.01 * screen_width, 0.72 * screen_width, 0.20 * screen_height),
+    "Bible-CL": ("kingthings-clarity.kingthings-clarity.ttf",
+                 0.012 * screen_width, 0.96 * screen_width, 0.195 * screen_height),
+    # Right-hand column of three, less its padding; the box grows down the screen
+    "Bible": ("kingthings-clarity.kingthings-clarity.ttf",
+              0.03 * screen_height, 0.99 * screen_width / 3, 0.85 * screen_height),
+}
+# Width of a spacing vowel sign (category Mc) the font has no glyph for, as a share of its average advance
+spacing_mark_share = 0.5
+
+# --- Slide break file layout ---
+slides_magic = b"VSLD"
+slides_format_version = 2
+# magic, version, lines per slide, verse count, break count, info JSON size, signature;
+# the info JSON holds the non-canonical verses' breaks, the font measured and its fallback share
+slides_header = struct.Struct("<4sHHIII16s")
+
+word_re = re.compile(r"\S+")
+
+class FontMetrics:
+    """Horizontal advances of a TrueType/OpenType font, read from its cmap, hmtx and hhea tables.
+
+    Characters the font has no glyph for (the stage fonts are Latin-only)
+    are measured the way a fallback font would roughly render them: combining
+    marks take no width, spacing vowel signs spacing_mark_share of the
+    font's average advance and everything else the whole average advance.
+    That is only an estimate; build_slides takes each language's own font.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        num_tables = struct.unpack_from(">H", data, 4)[0]
+        tables = {}
+        for i in range(num_tables):
+            tag, _, offset, length = struct.unpack_from(">4sIII", data, 12 + 16 * i)
+            tables[tag.decode("latin-1")] = offset
+        self.units_per_em = struct.unpack_from(">H", data, tables["head"] + 18)[0]
+        ascender, descender, line_gap = struct.unpack_from(">hhh", data, tables["hhea"] + 4)
+        self.line_height = (ascender - descender + line_gap) / self.units_per_em or 1.2
+        metric_count = struct.unpack_from(">H", data, tables["hhea"] + 34)[0]
+        advances = array("H", data[tables["hmtx"]:tables["hmtx"] + 4 * metric_count])
+        if sys.byteorder == "little":
+            advances.byteswap()
+        advances = advances[::2]
+        average = struct.unpack_from(">h", data, tables["OS/2"] + 2)[0] if "OS/2" in tables else 0
+        self.average_advance = average or sum(advances) // len(advances)
+        self.advances = {}
+        for char, glyph in read_cmap(data, tables["cmap"]).items():
+            self.advances[char] = advances[min(glyph, metric_count - 1)]
+
+    def advance(self, char):
+        units = self.advances.get(char)
+        if units is None:
+            category = unicodedata.category(char)
+            if category in ("Mn", "Me", "Cf"):
+                units = 0
+            elif category == "Mc":
+                units = self.average_advance * spacing_mark_share
+            else:
+                units = self.average_advance
+        return units
+
+    def fallback_share(self, counts):
+        """Share of the non-space characters in a Counter of text that the font has no glyph for."""
+        total = missing = 0
+        for char, count in counts.items():
+            if not char.isspace():
+                total += count
+                if char not in self.advances:
+                    missing += count
+        return missing / total if total else 0.0
+
+def read_cmap(data, cmap):
+    """Character -> glyph id from the best Unicode subtable (format 12, else format 4)."""
+    subtables = {}
+    for i in range(struct.unpack_from(">H", data, cmap + 2)[0]):
+        platform, encoding, offset = struct.unpack_from(">HHI", data, cmap + 4 + 8 * i)
+        subtables[(platform, encoding)] = cmap + offset
+    for key in ((3, 10), (0, 4), (0, 6), (3, 1), (0, 3), (0, 2), (0, 1), (0, 0)):
+        if key not in subtables:
+            continue
+        pos = subtables[key]
+        fmt = struct.unpack_from(">H", data, pos)[0]
+        if fmt == 12:
+            return read_cmap_format12(data, pos)
+        if fmt == 4:
+            return read_cmap_format4(data, pos)
+    return {}
+
+def read_cmap_format4(data, pos):
+    seg_count = struct.unpack_from(">H", data, pos + 6)[0] // 2
+    ends = struct.unpack_from(f">{seg_count}H", data, pos + 14)
+    starts = struct.unpack_from(f">{seg_count}H", data, pos + 16 + 2 * seg_count)
+    deltas = struct.unpack_from(f">{seg_count}h", data, pos + 16 + 4 * seg_count)
+    range_pos = pos + 16 + 6 * seg_count
+    range_offsets = struct.unpack_from(f">{seg_count}H", data, range_pos)
+    glyphs = {}
+    for i in range(seg_count):
+        for code in range(starts[i], ends[i] + 1):
+            if code == 0xFFFF:
+                continue
+            if range_offsets[i] == 0:
+                glyph = (code + deltas[i]) & 0xFFFF
+            else:
+                at = range_pos + 2 * i + range_offsets[i] + 2 * (code - starts[i])
+                glyph = struct.unpack_from(">H", data, at)[0]
+                if glyph:
+                    glyph = (glyph + deltas[i]) & 0xFFFF
+            if glyph:
+                glyphs[chr(code)] = glyph
+    return glyphs
+
+def read_cmap_format12(data, pos):
+    glyphs = {}
+    for i in range(struct.unpack_from(">I", data, pos + 12)[0]):
+        start, end, glyph = struct.unpack_from(">III", data, pos + 16 + 12 * i)
+        for code in range(start, end + 1):
+            glyphs[chr(code)] = glyph + code - start
+    return glyphs
+
+class TextMeasurer:
+    """Pixel widths of words in one font at one size, each word measured once."""
+
+    def __init__(self, font, size):
+        self.font = font
+        self.scale = size / font.units_per_em
+        self.line_height = font.line_height * size
+        self.widths = {}
+        self.space = self.width(" ")
+
+    def width(self, word):
+        w = self.widths.get(word)
+        if w is None:
+            w = self.widths[word] = sum(map(self.font.advance, word)) * self.scale
+        return w
+
+    def slide_breaks(self, text, width, lines_per_slide):
+        """Character offsets where the 2nd, 3rd, ... slide of a greedily word-wrapped text starts."""
+        breaks = []
+        lines = 1
+        line_width = None
+        for m in word_re.finditer(text):
+            w = self.width(m[0])
+            if line_width is None:
+                line_width = w
+            elif line_width + self.space + w <= width:
+                line_width += self.space + w
+            else:
+                line_width = w
+                lines += 1
+                if lines > lines_per_slide:
+                    breaks.append(m.start())
+                    lines = 1
+        return breaks
+
+# Measurement caches, one per (font file, size)
+fonts = {}
+measurers = {}
+
+def measurer(font_path, size):
+    key = (os.path.abspath(font_path), size)
+    if key not in measurers:
+        if key[0] not in fonts:
+            fonts[key[0]] = FontMetrics(font_path)
+        measurers[key] = TextMeasurer(fonts[key[0]], size)
+    return measurers[key]
+
+def slides_path(directory, code, profile):
+    return os.path.join(directory, f"{code}.{profile}.slides")
+
+def profile_signature(store, font_path, profile):
+    """Digest of everything the break points depend on: verse text, font file and layout."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([slides_format_version, *layout_profiles[profile][1:]]).encode("utf-8"))
+    with open(font_path, "rb") as f:
+        h.update(f.read())
+    h.update(store.buffer)
+    h.update(json.dumps(sorted(store.extra.items()), ensure_ascii=False).encode("utf-8"))
+    return h.digest()
+
+class SlideBreaks:
+    """Precomputed slide break offsets for one translation and layout profile.
+
+    The breaks of verse i are breaks[starts[i]:starts[i + 1]]; a verse that
+    fits on one slide has none. Non-canonical verses keep theirs in `extra`.
+    `font` is the font file measured and `fallback_share` the share of the
+    text it had no glyph for, whose widths are only estimated.
+    """
+
+    def __init__(self, starts, breaks, extra, lines_per_slide, signature=bytes(16), font="", fallback_share=0.0):
+        self.starts = starts
+        self.breaks = breaks
+        self.extra = extra
+        self.lines_per_slide = lines_per_slide
+        self.signature = signature
+        self.font = font
+        self.fallback_share = fallback_share
+
+    @classmethod
+    def build(cls, store, font_path, profile):
+        _, size, width, height = layout_profiles[profile]
+        m = measurer(font_path, size)
+        lines_per_slide = max(1, int(height // m.line_height))
+        starts = array("I", [0])
+        breaks = array("I")
+        for i in range(verse_count):
+            if store.present[i]:
+                breaks.extend(m.slide_breaks(store.text(i), width, lines_per_slide))
+            starts.append(len(breaks))
+        extra = {"|".join(key): m.slide_breaks(text, width, lines_per_slide) for key, text in store.extra.items()}
+        counts = Counter(str(store.buffer, "utf-8"))
+        for text in store.extra.values():
+            counts.update(text)
+        return cls(starts, breaks, extra, lines_per_slide, profile_signature(store, font_path, profile),
+                   os.path.basename(font_path), m.font.fallback_share(counts))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, lines_per_slide, count, break_count, info_size, signature = slides_header.unpack_from(data)
+        if magic != slides_magic or version != slides_format_version or count != verse_count:
+            raise ValueError(f"{path} is not a version {slides_format_version} slide break file")
+        pos = slides_header.size
+        starts = array("I", data[pos:pos + 4 * (count + 1)])
+        pos += 4 * (count + 1)
+        breaks = array("I", data[pos:pos + 4 * break_count])
+        pos += 4 * break_count
+        if sys.byteorder != "little":
+            starts.byteswap()
+            breaks.byteswap()
+        info = json.loads(data[pos:pos + info_size].decode("utf-8"))
+        return cls(starts, breaks, info["extra"], lines_per_slide, signature, info["font"], info["fallback_share"])
+
+    def save(self, path):
+        starts = array("I", self.starts)
+        breaks = array("I", self.breaks)
+        if sys.byteorder != "little":
+            starts.byteswap()
+            breaks.byteswap()
+        info = json.dumps({"extra": self.extra, "font": self.font, "fallback_share": self.fallback_share},
+                          ensure_ascii=False).encode("utf-8")
+        with open(path + ".tmp", "wb") as f:
+            f.write(slides_header.pack(slides_magic, slides_format_version, self.lines_per_slide, verse_count,
+                                       len(self.breaks), len(info), self.signature))
+            f.write(starts.tobytes())
+            f.write(breaks.tobytes())
+            f.write(info)
+        os.replace(path + ".tmp", path)
+
+    def verse_breaks(self, index):
+        return self.breaks[self.starts[index]:self.starts[index + 1]]
+
+    def slides(self, text, index=None, key=None):
+        """Split a verse's text into its slides, by dense index or (book, chapter, verse) key."""
+        cuts = self.verse_breaks(index) if index is not None else self.extra.get("|".join(key), [])
+        bounds = [0, *cuts, len(text)]
+        return [text[a:b].strip() for a, b in zip(bounds, bounds[1:])]
+
+def build_slides(directory, codes, profiles, font_dir=fonts_dir, force=False, language_fonts=None):
+    """Write <code>.<profile>.slides next to each .vstore, skipping files whose inputs are unchanged.
+
+    language_fonts maps a language code to the font file its text is measured
+    in, in place of the profile's stage font.
+    """
+    language_fonts = language_fonts or {}
+    for code in codes:
+        store = VerseStore.open(os.path.join(directory, f"{code}.vstore"))
+        for profile in profiles:
+            font_path = language_fonts.get(code) or os.path.join(font_dir, layout_profiles[profile][0])
+            path = slides_path(directory, code, profile)
+            slides = None
+            if not force and os.path.exists(path):
+                try:
+                    slides = SlideBreaks.load(path)
+                except ValueError:
+                    # Written by an older format version
+                    pass
+                if slides and slides.signature == profile_signature(store, font_path, profile):
+                    print(f"{code} {profile}: up to date")
+                else:
+                    slides = None
+            if slides is None:
+                start = time.perf_counter()
+                slides = SlideBreaks.build(store, font_path, profile)
+                slides.save(path)
+                split = sum(1 for i in range(verse_count) if slides.starts[i + 1] > slides.starts[i])
+                print(f"{code} {profile}: {split} verses need more than one slide "
+                      f"({slides.lines_per_slide} lines per slide, {time.perf_counter() - start:.2f}s)")
+            if slides.fallback_share >= 0.01:
+                print(f"[Warning] {code} {profile}: {slides.fallback_share:.0%} of the text has no glyph in "
+                      f"{slides.font}, so its breaks are estimated; pass --font {code}=FONT to measure it")
+
+def parse_font_spec(text):
+    """'tel=NotoSansTelugu.ttf' -> ('tel', 'NotoSansTelugu.ttf')."""
+    code, sep, path = text.partition("=")
+    known = [t[0] for t in translations]
+    if not sep or not path:
+        raise argparse.ArgumentTypeError(f"expected CODE=FONT, got {text!r}")
+    if code not in known:
+        raise argparse.ArgumentTypeError(f"unknown language {code!r} (choose from {', '.join(known)})")
+    if not os.path.isfile(path):
+        raise argparse.ArgumentTypeError(f"font file not found: {path}")
+    return code, path
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute where each verse breaks into slides on the stage layouts.")
+    parser.add_argument("--profile", action="append", choices=sorted(layout_profiles),
+                        help="layout profile to compute (repeatable; default: all)")
+    parser.add_argument("--lang", help="comma-separated language codes (default: all)")
+    parser.add_argument("--stores", default=store_dir, help=f"directory of .vstore files (default: {store_dir})")
+    parser.add_argument("--fonts", default=fonts_dir, help=f"directory of stage fonts (default: {fonts_dir})")
+    parser.add_argument("--font", metavar="CODE=FONT", action="append", type=parse_font_spec,
+                        help="measure one language in its own font file, e.g. tel=NotoSansTelugu-Regular.ttf, "
+                             "instead of the stage font (repeatable)")
+    parser.add_argument("--force", action="store_true", help="recompute even if the inputs are unchanged")
+    args = parser.parse_args()
+
+    codes = args.lang.split(",") if args.lang else [t[0] for t in translations]
+    build_slides(args.stores, codes, args.profile or list(layout_profiles), args.fonts, args.force,
+                 dict(args.font or []))
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
+import argparse
 import os
 import re
 import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 
 # ------------------------------
 # Relative Paths
@@ -9,14 +12,15 @@ input_folder = os.path.join('.', 'OneDrive_2024-12-31', 'Christ in Song')
 output_folder = os.path.join('.', 'SourceFiles')
 output_file = os.path.join(output_folder, 'all_songs.txt')
 
-# Ensure output folder exists
-os.makedirs(output_folder, exist_ok=True)
-
 # ------------------------------
 # XML Namespace
 # ------------------------------
 ns = {'ol': 'http://openlyrics.info/namespace/2009/song'}
 
+# Chord-only lines (like D, D/E, G#m7) and section labels dropped from the lyrics
+chord_re = re.compile(r'^[A-G][#b]?(m|min|maj|dim|aug)?\d*(/[A-G][#b]?(m|min|maj|dim|aug)?\d*)*$')
+label_re = re.compile(r'^(verse|chorus|bridge|tag|refrain)\b.*$', re.IGNORECASE)
+
 # ------------------------------
 # Helper: clean text and remove chord lines
 # ------------------------------
@@ -31,10 +35,10 @@ def clean_lines(text: str) -> str:
         if not stripped:
             continue
         # Chord patterns
-        if re.match(r'^[A-G][#b]?(m|min|maj|dim|aug)?\d*(/[A-G][#b]?(m|min|maj|dim|aug)?\d*)*$', stripped):
+        if chord_re.match(stripped):
             continue
         # Labels
-        if re.match(r'^(verse|chorus|bridge|tag|refrain)\b.*$', stripped, re.IGNORECASE):
+        if label_re.match(stripped):
             continue
         cleaned.append(stripped)
     return '\n'.join(cleaned)
@@ -59,9 +63,19 @@ def get_full_text(lines_el):
 # ------------------------------
 # Function to process a single XML file
 # ------------------------------
-def process_song(file_path):
+def process_song(file_path, member=None):
+    """Return (song_text, song_number) for one OpenLyrics song.
+
+    process_song(file_path) reads an XML file path or open file object;
+    process_song(zip_path, member) streams that member of a .zip archive
+    without extracting it.
+    """
     try:
-        tree = ET.parse(file_path)
+        if member is not None:
+            with zipfile.ZipFile(file_path) as archive, archive.open(member) as f:
+                tree = ET.parse(f)
+        else:
+            tree = ET.parse(file_path)
         root = tree.getroot()
     except ET.ParseError:
         return "", float('inf')
@@ -168,20 +182,102 @@ def process_song(file_path):
 # ------------------------------
 # Process all XML files
 # ------------------------------
-if not os.path.exists(input_folder):
-    print(f"Input folder does not exist: {input_folder}")
-else:
-    songs_list = []
-
-    for filename in os.listdir(input_folder):
-        if filename.lower().endswith('.xml'):
-            file_path = os.path.join(input_folder, filename)
-            song_text, song_number = process_song(file_path)
-            if not song_text.strip():
-                continue
-            songs_list.append((song_number, song_text))
-
-    # Sort songs by number
+def split_zip_path(path):
+    """('Songs.zip', 'Christ in Song') for 'Songs.zip/Christ in Song', ('Songs.zip', None) for 'Songs.zip'."""
+    parts = os.path.normpath(path).split(os.sep)
+    for i in range(len(parts), 0, -1):
+        candidate = os.sep.join(parts[:i])
+        if candidate.lower().endswith('.zip') and os.path.isfile(candidate):
+            return candidate, '/'.join(parts[i:]) or None
+    return None, None
+
+def list_songs(input_path):
+    """XML songs under input_path: file paths for a folder, (zip path, member) pairs for an archive.
+
+    Like a folder, which is not searched recursively, a bare .zip yields the
+    XML members at the archive root and 'archive.zip/folder' those directly
+    in that folder, never the ones in its subfolders.
+    """
+    zip_path, folder = split_zip_path(input_path)
+    if zip_path is None:
+        return [os.path.join(input_path, filename) for filename in os.listdir(input_path)
+                if filename.lower().endswith('.xml')]
+    folder = (folder or '').strip('/')
+    return [(zip_path, name) for name in zip_members(zip_path) if name.rpartition('/')[0] == folder]
+
+def zip_members(zip_path):
+    with zipfile.ZipFile(zip_path) as archive:
+        return [name for name in archive.namelist() if name.lower().endswith('.xml')]
+
+def zip_song_folders(zip_path):
+    """Folders inside the archive that directly hold XML songs, as 'archive.zip/folder' inputs."""
+    folders = sorted({name.rpartition('/')[0] for name in zip_members(zip_path)})
+    return [f"{zip_path}/{folder}" if folder else zip_path for folder in folders]
+
+def process_songs(songs):
+    """Process a chunk of songs in a worker; returns (song_number, song_text) for each in order.
+
+    Each archive is opened once per chunk and its members are parsed
+    straight from it.
+    """
+    results = []
+    archives = {}
+    try:
+        for song in songs:
+            if isinstance(song, tuple):
+                zip_path, member = song
+                if zip_path not in archives:
+                    archives[zip_path] = zipfile.ZipFile(zip_path)
+                with archives[zip_path].open(member) as f:
+                    song_text, song_number = process_song(f)
+            else:
+                song_text, song_number = process_song(song)
+            results.append((song_number, song_text))
+    finally:
+        for archive in archives.values():
+            archive.close()
+    return results
+
+def collect_songs(file_paths, jobs=1, chunk_size=64):
+    """(song_number, song_text) for every entry of list_songs(), in that order.
+
+    With jobs > 1 the files are split into chunks handed to a process pool;
+    results come back in submission order, so the sorted output is the same
+    as a serial run.
+    """
+    if jobs <= 1:
+        return process_songs(file_paths)
+    chunks = [file_paths[i:i + chunk_size] for i in range(0, len(file_paths), chunk_size)]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return [song for chunk in pool.map(process_songs, chunks) for song in chunk]
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the OpenLyrics XML songs into one all_songs.txt.")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help=f"number of worker processes (default: 1 = serial; this machine has {os.cpu_count()} CPUs)")
+    parser.add_argument("--input", default=input_folder,
+                        help="folder of XML songs, a .zip of them, or a folder inside a .zip such as "
+                             f"'OneDrive_2024-12-31.zip/Christ in Song' (default: {input_folder})")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input) and split_zip_path(args.input)[0] is None:
+        print(f"Input folder does not exist: {args.input}")
+        return
+
+    file_paths = list_songs(args.input)
+    zip_path = split_zip_path(args.input)[0]
+    if not file_paths and zip_path is not None:
+        print(f"No XML songs directly in {args.input}; pick one of its song folders:")
+        for folder in zip_song_folders(zip_path):
+            print(f"  --input \"{folder}\"")
+        return
+
+    # Ensure output folder exists
+    os.makedirs(output_folder, exist_ok=True)
+    songs_list = [(song_number, song_text) for song_number, song_text in collect_songs(file_paths, args.jobs)
+                  if song_text.strip()]
+
+    # Sort songs by number (stable, so equal numbers keep the directory order)
     songs_list.sort(key=lambda x: x[0])
     all_songs_text = ''.join(song_text for _, song_text in songs_list)
 
@@ -190,3 +286,6 @@ else:
 
     print(f"All songs exported to {output_file}")
     print(f"Total songs processed: {len(songs_list)}")
+
+if __name__ == "__main__":
+    main()
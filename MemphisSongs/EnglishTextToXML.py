@@ -1,5 +1,12 @@
+import argparse
+import hashlib
+import io
 import os
+import re
+import sqlite3
+import zipfile
 import xml.etree.ElementTree as ET
+from collections import namedtuple
 from datetime import datetime
 
 # ------------------------------
@@ -7,12 +14,32 @@ from datetime import datetime
 # ------------------------------
 source_file = os.path.join('.', 'SourceFiles', 'all_songs.txt')
 output_folder = os.path.join('.', 'XMLOutput')
-os.makedirs(output_folder, exist_ok=True)
+songbook_name = "Memphis Saints"
+# Default bundle files, next to the output folder; the database is named after
+# the songbook so the songbooks' databases never overwrite each other
+bundle_files = {
+    "zip": os.path.join('.', 'XMLOutput.zip'),
+    "sqlite": os.path.join('.', f'{songbook_name}.sqlite'),
+}
 
 # XML namespace
 NS = "http://openlyrics.info/namespace/2009/song"
 ET.register_namespace('', NS)
 
+# Lines that end the chorus or verse being collected
+BLOCK_STARTS = ("Chorus", "SongNumber", "SongTitle", "VerseOrder")
+
+Song = namedtuple("Song", "number title verse_order choruses verses")
+
+# Blanked out before hashing, so only the song's content decides whether it changed
+MODIFIED_DATE_RE = re.compile(rb'modifiedDate="[^"]*"')
+
+# How OpenLP builds its search columns: formatting tags dropped, apostrophes removed,
+# any other run of punctuation or spaces turned into one space
+TAG_RE = re.compile(r'\{/?[^{}]*\}')
+APOSTROPHE_RE = re.compile("['`’ʻ′]")
+WHITESPACE_RE = re.compile(r'[\W_]+')
+
 # ------------------------------
 # Helper to create XML structure
 # ------------------------------
@@ -35,7 +62,7 @@ def create_song_xml(song_number, song_title, verse_order, choruses, verses):
     authors_el = ET.SubElement(props_el, "authors")
     ET.SubElement(authors_el, "author").text = "His Servant"
     songbooks_el = ET.SubElement(props_el, "songbooks")
-    ET.SubElement(songbooks_el, "songbook", {"name": "Memphis Saints", "entry": str(song_number)})
+    ET.SubElement(songbooks_el, "songbook", {"name": songbook_name, "entry": str(song_number)})
 
     # lyrics
     lyrics_el = ET.SubElement(song_el, "lyrics")
@@ -59,41 +86,201 @@ def create_song_xml(song_number, song_title, verse_order, choruses, verses):
     return ET.ElementTree(song_el)
 
 # ------------------------------
-# Read and split source file carefully
+# Skip songs whose content has not changed
 # ------------------------------
-with open(source_file, 'r', encoding='utf-8') as f:
-    content = f.read()
+def song_bytes(tree):
+    buffer = io.BytesIO()
+    tree.write(buffer, encoding="utf-8", xml_declaration=True)
+    return buffer.getvalue()
 
-# Split by double newlines
-raw_songs = [s.strip() for s in content.split('\n\n') if s.strip()]
+def content_hash(data):
+    """Hash of an OpenLyrics file's bytes, ignoring its modifiedDate."""
+    return hashlib.sha256(MODIFIED_DATE_RE.sub(b'modifiedDate=""', data)).hexdigest()
 
-# Filter: only include blocks starting with SongNumber:
-valid_songs = []
-orphan_text = []
-for s in raw_songs:
-    if s.startswith("SongNumber:"):
-        valid_songs.append(s)
-    else:
-        orphan_text.append(s)
+def song_filename(song):
+    safe_title = "".join(c if c.isalnum() or c in " _-" else "_" for c in song.title)
+    return f"{song.number}_{safe_title}.xml"
 
-print(f"Total valid songs found in source file: {len(valid_songs)}")
-if orphan_text:
-    print(f"Found {len(orphan_text)} orphan text blocks between songs (ignored).")
+def unique_filename(song, names, song_idx):
+    """song_filename(song), numbered with the song's position if an earlier song in this run took the name."""
+    filename = song_filename(song)
+    if filename in names:
+        print(f"[Warning] Duplicate file name {filename} for song number {song.number}, kept both")
+        filename = f"{filename[:-4]}_{song_idx}.xml"
+    names.add(filename)
+    return filename
+
+def write_if_changed(file_path, data):
+    """Write data unless the existing file has the same content; returns True if it was written."""
+    if os.path.exists(file_path):
+        with open(file_path, 'rb') as f:
+            if content_hash(f.read()) == content_hash(data):
+                return False
+    with open(file_path, 'wb') as f:
+        f.write(data)
+    return True
 
 # ------------------------------
-# Process each valid song
+# Bundle output: every song in one zip or one OpenLP database
 # ------------------------------
-for song_idx, song_text in enumerate(valid_songs, 1):
-    lines = song_text.splitlines()
+def write_songs_zip(zip_path, songs):
+    """Stream each song's OpenLyrics document into one zip; returns the number of songs written."""
+    count = 0
+    names = set()
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for song in songs:
+            count += 1
+            tree = create_song_xml(song.number, song.title, song.verse_order, song.choruses, song.verses)
+            filename = unique_filename(song, names, count)
+            zf.writestr(filename, song_bytes(tree))
+    return count
+
+def search_text(text):
+    return WHITESPACE_RE.sub(' ', APOSTROPHE_RE.sub('', TAG_RE.sub('', text))).lower()
+
+def cdata(text):
+    return "<![CDATA[" + text.replace("]]>", "]]]]><![CDATA[>") + "]]>"
+
+def song_verses(song):
+    """(type, label, text) of each chorus and verse, in the order create_song_xml writes them."""
+    for num, chorus_text in song.choruses.items():
+        yield "c", str(num), f"{{lang-eng}}{chorus_text.strip()}{{/lang-eng}}"
+    for idx, verse_text in enumerate(song.verses, 1):
+        yield "v", str(idx), f"{{lang-eng}}{verse_text.strip()}{{/lang-eng}}"
+
+def openlp_lyrics(verses):
+    """The lyrics XML OpenLP keeps in songs.lyrics."""
+    parts = ["<?xml version='1.0' encoding='UTF-8'?>\n<song version=\"1.0\"><lyrics>"]
+    for verse_type, label, text in verses:
+        parts.append(f'<verse type="{verse_type}" label="{label}">{cdata(text)}</verse>')
+    parts.append("</lyrics></song>")
+    return "".join(parts)
+
+def write_songs_db(db_path, songs, songbook, author="His Servant", batch_size=500):
+    """Write songs as an OpenLP songs database; returns the number of songs written.
+
+    The file holds this songbook alone, in OpenLP's songs schema. Bring it
+    into OpenLP with the song import wizard's OpenLP database option; copying
+    it over songs.sqlite would replace the whole song library.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    count = 0
+    db = sqlite3.connect(db_path)
+    try:
+        with db:
+            db.executescript("""
+                CREATE TABLE metadata (key VARCHAR(64) NOT NULL PRIMARY KEY, value TEXT);
+                CREATE TABLE authors (id INTEGER NOT NULL PRIMARY KEY, first_name VARCHAR(128),
+                                      last_name VARCHAR(128), display_name VARCHAR(255) NOT NULL);
+                CREATE TABLE song_books (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(128) NOT NULL,
+                                         publisher VARCHAR(128));
+                CREATE TABLE songs (id INTEGER NOT NULL PRIMARY KEY, title VARCHAR(255) NOT NULL,
+                                    alternate_title VARCHAR(255), lyrics TEXT NOT NULL, verse_order VARCHAR(128),
+                                    copyright VARCHAR(255), comments TEXT, ccli_number VARCHAR(64),
+                                    theme_name VARCHAR(128), search_title VARCHAR(255) NOT NULL,
+                                    search_lyrics TEXT NOT NULL, create_date DATETIME, last_modified DATETIME,
+                                    temporary BOOLEAN);
+                CREATE TABLE topics (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(128) NOT NULL);
+                CREATE TABLE media_files (id INTEGER NOT NULL PRIMARY KEY, song_id INTEGER REFERENCES songs (id),
+                                          file_path TEXT NOT NULL, file_hash VARCHAR(128), type VARCHAR(64),
+                                          weight INTEGER);
+                CREATE TABLE authors_songs (author_id INTEGER NOT NULL REFERENCES authors (id),
+                                            song_id INTEGER NOT NULL REFERENCES songs (id),
+                                            author_type VARCHAR(255) NOT NULL DEFAULT '',
+                                            PRIMARY KEY (author_id, song_id, author_type));
+                CREATE TABLE songs_songbooks (songbook_id INTEGER NOT NULL REFERENCES song_books (id),
+                                              song_id INTEGER NOT NULL REFERENCES songs (id),
+                                              entry VARCHAR(255) NOT NULL,
+                                              PRIMARY KEY (songbook_id, song_id, entry));
+                CREATE TABLE songs_topics (song_id INTEGER NOT NULL REFERENCES songs (id),
+                                           topic_id INTEGER NOT NULL REFERENCES topics (id),
+                                           PRIMARY KEY (song_id, topic_id));
+            """)
+            db.execute("INSERT INTO metadata (key, value) VALUES ('version', '7')")
+            db.execute("INSERT INTO authors (id, first_name, last_name, display_name) VALUES (1, '', '', ?)",
+                       (author,))
+            db.execute("INSERT INTO song_books (id, name, publisher) VALUES (1, ?, '')", (songbook,))
+            rows = []
+            for song in songs:
+                count += 1
+                verses = list(song_verses(song))
+                rows.append((count, song.title, song.number, openlp_lyrics(verses), song.verse_order,
+                             search_text(song.title) + "@" + search_text(song.number),
+                             " ".join(search_text(text) for _, _, text in verses), now, now))
+                if len(rows) >= batch_size:
+                    insert_song_rows(db, rows)
+                    rows.clear()
+            insert_song_rows(db, rows)
+            db.executescript("""
+                CREATE INDEX ix_songs_search_title ON songs (search_title);
+                CREATE INDEX ix_songs_search_lyrics ON songs (search_lyrics);
+                CREATE INDEX ix_authors_display_name ON authors (display_name);
+                CREATE INDEX ix_song_books_name ON song_books (name);
+                CREATE INDEX ix_topics_name ON topics (name);
+            """)
+    finally:
+        db.close()
+    return count
+
+def insert_song_rows(db, rows):
+    db.executemany("INSERT INTO songs (id, title, alternate_title, lyrics, verse_order, copyright, comments, "
+                   "ccli_number, search_title, search_lyrics, create_date, last_modified, temporary) "
+                   "VALUES (?, ?, ?, ?, ?, '', '', '', ?, ?, ?, ?, 0)", rows)
+    db.executemany("INSERT INTO authors_songs (author_id, song_id, author_type) VALUES (1, ?, 'words')",
+                   [(row[0],) for row in rows])
+    db.executemany("INSERT INTO songs_songbooks (songbook_id, song_id, entry) VALUES (1, ?, ?)",
+                   [(row[0], row[2]) for row in rows])
+
+# ------------------------------
+# Line-by-line song parser
+# ------------------------------
+def is_verse_start(line):
+    return line[:1].isdigit() and line[1:2] == '.'
+
+def iter_blocks(f):
+    """Yield the lines of each blank-line separated block, without its leading whitespace-only lines."""
+    block = []
+    for raw_line in f:
+        if raw_line == '\n':
+            if block:
+                yield block
+            block = []
+            continue
+        for line in raw_line.splitlines():
+            if block or line.strip():
+                block.append(line)
+    if block:
+        yield block
+
+def parse_song(lines, song_idx):
+    """Parse one block's lines into a Song, in a single pass over the stripped lines."""
     song_number = None
     song_title = None
     verse_order = ""
     choruses = {}
     verses = []
 
-    idx = 0
-    while idx < len(lines):
-        line = lines[idx].strip()
+    # The chorus number or verse being collected, and its lines so far
+    target = None
+    collected = []
+
+    def finish():
+        # remove extra spaces from each line
+        text = "\n".join(l for l in collected if l)
+        if target == "verse":
+            verses.append(text)
+        elif target is not None:
+            choruses[target] = text
+
+    for line in lines:
+        line = line.strip()
+        if target is not None and not (line.startswith(BLOCK_STARTS) or is_verse_start(line)):
+            collected.append(line)
+            continue
+        finish()
+        target = None
 
         if line.startswith("SongNumber:"):
             song_number = line.replace("SongNumber:", "").strip()
@@ -108,42 +295,17 @@ for song_idx, song_text in enumerate(valid_songs, 1):
             # New chorus block
             parts = line.split(":", 1)
             if len(parts) == 2:
-                num_part = parts[0].strip()
-                text = parts[1].strip()
                 try:
-                    num = int(num_part.replace("Chorus", ""))
-                    chorus_lines = [text] if text else []
-                    idx += 1
-                    # collect all following lines until next block
-                    while idx < len(lines) and not (
-                        lines[idx].strip().startswith(("Chorus", "SongNumber", "SongTitle", "VerseOrder"))
-                        or (lines[idx].strip() and lines[idx].strip()[0].isdigit() and lines[idx].strip()[1] == '.')
-                    ):
-                        chorus_lines.append(lines[idx].strip())
-                        idx += 1
-                    # remove extra spaces from each line
-                    chorus_clean = "\n".join(l.strip() for l in chorus_lines if l.strip())
-                    choruses[num] = chorus_clean
-                    continue
+                    target = int(parts[0].strip().replace("Chorus", ""))
+                    collected = [parts[1].strip()]
                 except ValueError:
                     print(f"[Warning] Invalid chorus number in song {song_number}: {line}")
 
-        elif line and line[0].isdigit() and line[1] == '.':
+        elif is_verse_start(line):
             # Verse block
-            verse_lines = [line.split('.', 1)[1].strip()]
-            idx += 1
-            while idx < len(lines) and not (
-                lines[idx].strip().startswith(("Chorus", "SongNumber", "SongTitle", "VerseOrder"))
-                or (lines[idx].strip() and lines[idx].strip()[0].isdigit() and lines[idx].strip()[1] == '.')
-            ):
-                verse_lines.append(lines[idx].strip())
-                idx += 1
-            # remove extra spaces from each line
-            verse_clean = "\n".join(l.strip() for l in verse_lines if l.strip())
-            verses.append(verse_clean)
-            continue
-
-        idx += 1
+            target = "verse"
+            collected = [line.split('.', 1)[1].strip()]
+    finish()
 
     # Validations
     if not song_number:
@@ -158,16 +320,75 @@ for song_idx, song_text in enumerate(valid_songs, 1):
     if not verses and not choruses:
         print(f"[Warning] No lyrics found in song number {song_number}")
 
-    # Create XML
-    tree = create_song_xml(song_number, song_title, verse_order, choruses, verses)
+    return Song(song_number, song_title, verse_order, choruses, verses)
+
+def iter_songs(f, orphans):
+    """Yield each song as soon as its block ends; blocks not starting with SongNumber: are appended to orphans."""
+    song_idx = 0
+    for block in iter_blocks(f):
+        if block[0].lstrip().startswith("SongNumber:"):
+            song_idx += 1
+            yield parse_song(block, song_idx)
+        else:
+            orphans.append(block[0].strip())
+
+# ------------------------------
+# Command line
+# ------------------------------
+parser = argparse.ArgumentParser(description="Convert all_songs.txt into OpenLyrics XML files for OpenLP.")
+parser.add_argument("--bundle", choices=sorted(bundle_files),
+                    help="write every song into one zip of OpenLyrics files or one OpenLP songs database, "
+                         "instead of one file per song")
+parser.add_argument("--bundle-file", metavar="PATH",
+                    help=f"where to write the bundle (default: XMLOutput.zip or {songbook_name}.sqlite)")
+args = parser.parse_args()
+if args.bundle_file and not args.bundle:
+    parser.error("--bundle-file requires --bundle")
+
+# ------------------------------
+# Parse and write each song as it is read
+# ------------------------------
+orphan_text = []
+song_count = 0
+unchanged_count = 0
+# File names taken so far in this run, so songs sharing a name don't overwrite each other
+used_names = set()
+with open(source_file, 'r', encoding='utf-8') as f:
+    if args.bundle:
+        bundle_file = args.bundle_file or bundle_files[args.bundle]
+        songs = iter_songs(f, orphan_text)
+        if args.bundle == "zip":
+            song_count = write_songs_zip(bundle_file, songs)
+        else:
+            song_count = write_songs_db(bundle_file, songs, songbook_name)
+    else:
+        os.makedirs(output_folder, exist_ok=True)
+        for song in iter_songs(f, orphan_text):
+            song_count += 1
+
+            # Create XML
+            tree = create_song_xml(song.number, song.title, song.verse_order, song.choruses, song.verses)
 
-    # Save file
-    safe_title = "".join(c if c.isalnum() or c in " _-" else "_" for c in song_title)
-    filename = f"{song_number}_{safe_title}.xml"
-    file_path = os.path.join(output_folder, filename)
-    tree.write(file_path, encoding="utf-8", xml_declaration=True)
+            # Save file
+            filename = unique_filename(song, used_names, song_count)
+            file_path = os.path.join(output_folder, filename)
+            # Only songs whose lyrics or properties changed get a new file (and modifiedDate)
+            if not write_if_changed(file_path, song_bytes(tree)):
+                unchanged_count += 1
+                continue
 
-    # Log only SongNumber and filename
-    print(f"[Saved] SongNumber: {song_number} -> {filename}")
+            # Log only SongNumber and filename
+            print(f"[Saved] SongNumber: {song.number} -> {filename}")
 
-print(f"All XML files generated in folder: {output_folder}")
+print(f"Total valid songs found in source file: {song_count}")
+if orphan_text:
+    print(f"Found {len(orphan_text)} orphan text blocks between songs (ignored).")
+if unchanged_count:
+    print(f"{unchanged_count} unchanged songs were left as they are.")
+if args.bundle:
+    print(f"All songs written to {args.bundle} bundle: {bundle_file}")
+    if args.bundle == "sqlite":
+        print("[Warning] This database holds only this songbook. Import it with OpenLP's song import wizard "
+              "(OpenLP database); copying it over OpenLP's songs.sqlite would remove every other song.")
+else:
+    print(f"All XML files generated in folder: {output_folder}")